@@ -27,8 +27,11 @@ that will need to differ for different variants.
 
 import os
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext as _
 
 TOTAL_SCS = 34
@@ -81,7 +84,7 @@ def validate_preference_string(the_string):
                               params={'prefs': the_string})
     # Check for invalid powers in the string
     all_powers = set()
-    for p in GreatPower.objects.all():
+    for p in get_all_powers():
         all_powers.add(p.abbreviation)
     invalid = set(the_string) - all_powers
     if invalid:
@@ -166,3 +169,68 @@ class SupplyCentre(models.Model):
 
     def __str__(self):
         return self.name
+
+
+# The GreatPower and SupplyCentre tables never change in normal use,
+# so they're cached for a long time and discarded if they do change
+REFERENCE_CACHE_SECONDS = 60 * 60
+_POWERS_CACHE_KEY = 'diplomacy_all_powers'
+_SCS_CACHE_KEY = 'diplomacy_all_scs'
+_POWER_NAMES_CACHE_KEY = 'diplomacy_power_names'
+_SC_NAMES_CACHE_KEY = 'diplomacy_sc_names'
+
+
+def get_all_powers():
+    """
+    Returns a list of all the GreatPowers, from the cache if possible.
+    """
+    powers = cache.get(_POWERS_CACHE_KEY)
+    if powers is None:
+        powers = list(GreatPower.objects.all())
+        cache.set(_POWERS_CACHE_KEY, powers, REFERENCE_CACHE_SECONDS)
+    return powers
+
+
+def get_all_scs():
+    """
+    Returns a list of all the SupplyCentres, from the cache if possible.
+    """
+    scs = cache.get(_SCS_CACHE_KEY)
+    if scs is None:
+        scs = list(SupplyCentre.objects.all())
+        cache.set(_SCS_CACHE_KEY, scs, REFERENCE_CACHE_SECONDS)
+    return scs
+
+
+def get_power_names():
+    """
+    Returns a tuple of the names of all the GreatPowers, from the cache if possible.
+    Cheaper than get_all_powers() where only the names are needed.
+    """
+    names = cache.get(_POWER_NAMES_CACHE_KEY)
+    if names is None:
+        names = tuple(power.name for power in get_all_powers())
+        cache.set(_POWER_NAMES_CACHE_KEY, names, REFERENCE_CACHE_SECONDS)
+    return names
+
+
+def get_sc_names():
+    """
+    Returns a tuple of the names of all the SupplyCentres, from the cache if possible.
+    Cheaper than get_all_scs() where only the names are needed.
+    """
+    names = cache.get(_SC_NAMES_CACHE_KEY)
+    if names is None:
+        names = tuple(sc.name for sc in get_all_scs())
+        cache.set(_SC_NAMES_CACHE_KEY, names, REFERENCE_CACHE_SECONDS)
+    return names
+
+
+@receiver([post_save, post_delete], sender=GreatPower)
+def _great_powers_changed(sender, **kwargs):
+    cache.delete_many([_POWERS_CACHE_KEY, _POWER_NAMES_CACHE_KEY])
+
+
+@receiver([post_save, post_delete], sender=SupplyCentre)
+def _supply_centres_changed(sender, **kwargs):
+    cache.delete_many([_SCS_CACHE_KEY, _SC_NAMES_CACHE_KEY])
@@ -18,17 +18,23 @@
 Forms for the Diplomacy Tournament Visualiser.
 """
 
+from abc import ABCMeta, abstractmethod
+
 from django import forms
 from django.forms import ModelForm
+from django.forms.forms import DeclarativeFieldsMetaclass
 from django.forms.formsets import BaseFormSet
 from django.utils.translation import gettext as _
+from django.utils.translation import gettext_lazy
 
-from tournament.diplomacy import GreatPower, GameSet, SupplyCentre
+from tournament.diplomacy import GreatPower, GameSet
 from tournament.diplomacy import TOTAL_SCS, FIRST_YEAR
 from tournament.diplomacy import validate_preference_string
+from tournament.diplomacy import get_power_names, get_sc_names
 from tournament.models import Game, GameImage, SeederBias
 from tournament.models import SEASONS
 from tournament.models import PowerBid, Tournament, TournamentPlayer
+from tournament.models import RoundPlayer
 from tournament.players import Player
 
 
@@ -65,9 +71,13 @@ class BaseCheckInFormset(BaseFormSet):
         self.rounds = list(self.tp.tournament.round_set.all())
         # Create initial if not provided
         if 'initial' not in kwargs.keys():
+            # Find all the Rounds the player is already in with one query
+            rps = RoundPlayer.objects.filter(player=self.tp.player_id,
+                                             the_round__tournament=self.tp.tournament_id)
+            playing = set(rps.values_list('the_round_id', flat=True))
             initial = []
             for r in self.rounds:
-                initial.append({'playing': r.roundplayer_set.filter(player=self.tp.player).exists()})
+                initial.append({'playing': r.id in playing})
             kwargs['initial'] = initial
         super().__init__(*args, **kwargs)
 
@@ -86,8 +96,8 @@ class AuctionBidForm(forms.Form):
         self.funds = kwargs.pop('funds')
         super().__init__(*args, **kwargs)
         # Create the right country fields
-        for power in GreatPower.objects.all():
-            c = power.name
+        self._power_names = get_power_names()
+        for c in self._power_names:
             self.fields[c] = forms.IntegerField(min_value=PowerBid.MIN_BID,
                                                 max_value=PowerBid.MAX_BID)
             self.fields[c].label = _(c)
@@ -98,9 +108,9 @@ class AuctionBidForm(forms.Form):
         # Check for duplicate bids
         if not self.duplicate_bids_allowed:
             bid_dict = {}
-            for power in GreatPower.objects.all():
-                bid = self.cleaned_data[_(power.name)]
-                bid_dict.setdefault(bid, []).append(_(power.name))
+            for c in self._power_names:
+                bid = self.cleaned_data[_(c)]
+                bid_dict.setdefault(bid, []).append(_(c))
             errs = []
             for k, v in bid_dict.items():
                 if len(v) > 1:
@@ -111,8 +121,8 @@ class AuctionBidForm(forms.Form):
 
         # Check the total amount bid
         total = 0
-        for power in GreatPower.objects.all():
-            total += self.cleaned_data[_(power.name)]
+        for c in self._power_names:
+            total += self.cleaned_data[_(c)]
         if total > self.funds:
             raise forms.ValidationError(_('Bids total %(sum)d - greater than %(expected)d') % {'sum': total,
                                                                                                'expected': self.funds})
@@ -143,8 +153,10 @@ class BasePrefsFormset(BaseFormSet):
     def __init__(self, *args, **kwargs):
         # Remove our special kwarg from the list
         self.tournament = kwargs.pop('tournament')
-        # Get the list of TournamentPlayers
-        self.tps = list(self.tournament.tournamentplayer_set.all())
+        # Get the list of TournamentPlayers,
+        # with everything we need for the labels and initial values
+        tp_qs = self.tournament.tournamentplayer_set.select_related('player')
+        self.tps = list(tp_qs.prefetch_related('preference_set__power'))
         # Create initial if not provided
         if 'initial' not in kwargs.keys():
             # And construct initial data from it
@@ -191,29 +203,70 @@ class DrawForm(forms.Form):
             assert 0, 'Unexpected draw secrecy value %c' % secrecy
 
 
-class GameScoreForm(forms.Form):
+class DynamicFieldsFormMetaclass(ABCMeta, DeclarativeFieldsMetaclass):
+    """Metaclass allowing a Form to have abstract methods"""
+    pass
+
+
+class DynamicFieldsForm(forms.Form, metaclass=DynamicFieldsFormMetaclass):
+    """
+    Form with one extra field per GreatPower or SupplyCentre.
+
+    The extra fields are built the first time the form is used and added
+    to the class's base_fields, so that each instance just copies them,
+    as with declared fields. They're only rebuilt if the names change.
+    """
+    @classmethod
+    @abstractmethod
+    def dynamic_names(cls):
+        """Returns the list of names of the extra fields"""
+        raise NotImplementedError
+
+    @classmethod
+    @abstractmethod
+    def dynamic_field(cls, name):
+        """Returns a new field for the specified name"""
+        raise NotImplementedError
+
+    def __init__(self, *args, **kwargs):
+        cls = type(self)
+        names = cls.dynamic_names()
+        if cls.__dict__.get('_dynamic_names') != names:
+            # declared_fields and base_fields start out as the same dict
+            fields = dict(cls.declared_fields)
+            for name in names:
+                fields[name] = cls.dynamic_field(name)
+            cls.base_fields = fields
+            cls._dynamic_names = names
+        self._dynamic_names = names
+        super().__init__(*args, **kwargs)
+
+
+class GameScoreForm(DynamicFieldsForm):
     """Form for score for a single game"""
     name = forms.CharField(label=_(u'Game Name'),
                            max_length=Game.MAX_NAME_LENGTH,
                            disabled=True)
 
+    @classmethod
+    def dynamic_names(cls):
+        """One score field per Great Power"""
+        return get_power_names()
+
+    @classmethod
+    def dynamic_field(cls, name):
+        # Don't require a score for every player
+        field = forms.FloatField(required=False, label=gettext_lazy(name))
+        field.widget.attrs['size'] = 10
+        field.widget.attrs['maxlength'] = 10
+        return field
+
     def __init__(self, *args, **kwargs):
-        """Dynamically creates one score field per Great Power"""
         super().__init__(*args, **kwargs)
 
         attrs = self.fields['name'].widget.attrs
         attrs['size'] = attrs['maxlength']
 
-        # Create the right country fields
-        for power in GreatPower.objects.all():
-            c = power.name
-            # Don't require a score for every player
-            self.fields[c] = forms.FloatField(required=False)
-            self.fields[c].label = _(c)
-            attrs = self.fields[c].widget.attrs
-            attrs['size'] = 10
-            attrs['maxlength'] = 10
-
 
 class RoundPlayerChoiceField(forms.ModelChoiceField):
     """Field to pick a RoundPlayer"""
@@ -221,7 +274,7 @@ class RoundPlayerChoiceField(forms.ModelChoiceField):
         return obj.player.sortable_str()
 
 
-class GamePlayersForm(forms.Form):
+class GamePlayersForm(DynamicFieldsForm):
     """Form for players of a single game"""
     game_id = forms.IntegerField(required=False,
                                  widget=forms.HiddenInput())
@@ -232,8 +285,18 @@ class GamePlayersForm(forms.Form):
                             required=False,
                             max_length=Game.MAX_NOTES_LENGTH)
 
+    @classmethod
+    def dynamic_names(cls):
+        """One player field per Great Power"""
+        return get_power_names()
+
+    @classmethod
+    def dynamic_field(cls, name):
+        # The choices depend on the Round, so are filled in by __init__()
+        return RoundPlayerChoiceField(RoundPlayer.objects.none(),
+                                      label=gettext_lazy(name))
+
     def __init__(self, *args, **kwargs):
-        """Dynamically creates one player field per Great Power"""
         # Remove our special kwarg from the list
         self.the_round = kwargs.pop('the_round')
         super().__init__(*args, **kwargs)
@@ -241,20 +304,17 @@ class GamePlayersForm(forms.Form):
         attrs = self.fields['name'].widget.attrs
         attrs['size'] = attrs['maxlength']
 
-        queryset = self.the_round.roundplayer_set.all()
+        # The choice labels need the Players
+        queryset = self.the_round.roundplayer_set.select_related('player')
 
-        # Create the right country fields
-        for power in GreatPower.objects.all():
-            c = power.name
-            self.fields[c] = RoundPlayerChoiceField(queryset)
-            self.fields[c].label = _(c)
+        for c in self._dynamic_names:
+            self.fields[c].queryset = queryset
 
     def clean(self):
         """Checks that no player is playing multiple powers"""
         cleaned_data = self.cleaned_data
-        r_players = []
-        for power in GreatPower.objects.all():
-            c = power.name
+        r_players = set()
+        for c in self._dynamic_names:
             r_player = cleaned_data.get(c)
             # If the field itself didn't validate, drop out
             if r_player is None:
@@ -262,7 +322,7 @@ class GamePlayersForm(forms.Form):
             if r_player in r_players:
                 raise forms.ValidationError(_('Player %(player)s appears more than once')
                                             % {'player': r_player.player})
-            r_players.append(r_player)
+            r_players.add(r_player)
 
         return cleaned_data
 
@@ -316,17 +376,18 @@ class PowerAssignForm(forms.Form):
         queryset = GreatPower.objects.all()
 
         # Create the right player fields
+        self._gp_ids = []
         for gp in self.game.gameplayer_set.all().order_by('power__abbreviation'):
             c = gp.id
+            self._gp_ids.append(c)
             self.fields[c] = forms.ModelChoiceField(label=str(gp.player),
                                                     queryset=queryset)
 
     def clean(self):
         """Checks that no power is played by multiple players"""
         cleaned_data = super().clean()
-        powers = []
-        for player in self.game.gameplayer_set.all():
-            c = player.id
+        powers = set()
+        for c in self._gp_ids:
             power = cleaned_data.get(c)
             # If the field itself didn't validate, drop out
             if power is None:
@@ -334,7 +395,7 @@ class PowerAssignForm(forms.Form):
             if power in powers:
                 raise forms.ValidationError(_('Power %(power)s appears more than once')
                                             % {'power': power})
-            powers.append(power)
+            powers.add(power)
 
         return cleaned_data
 
@@ -447,7 +508,7 @@ class GetSevenPlayersForm(forms.Form):
 
     def _check_duplicates(self, cleaned_data, prefix, count):
         """Does the check for a player entered multiple times"""
-        round_players = []
+        round_players = set()
         for i in range(count):
             rp = cleaned_data.get('%s_%d' % (prefix, i))
             # If the field is empty, ignore it
@@ -456,7 +517,7 @@ class GetSevenPlayersForm(forms.Form):
             if rp in round_players:
                 raise forms.ValidationError(_('Player %(player)s appears more than once')
                                             % {'player': rp.player})
-            round_players.append(rp)
+            round_players.add(rp)
         return len(round_players)
 
     def clean(self):
@@ -501,22 +562,26 @@ class GetSevenPlayersForm(forms.Form):
         return cleaned_data
 
 
-class SCOwnerForm(forms.Form):
+class SCOwnerForm(DynamicFieldsForm):
     """Form for Supply Centre ownership for one year"""
     # Allow for an initial game-start SC ownership
     year = forms.IntegerField(min_value=FIRST_YEAR-1, required=False)
 
+    @classmethod
+    def dynamic_names(cls):
+        """One owner field per SupplyCentre"""
+        return get_sc_names()
+
+    @classmethod
+    def dynamic_field(cls, name):
+        return forms.ModelChoiceField(GreatPower.objects.all(),
+                                      required=False)
+
     def __init__(self, *args, **kwargs):
-        """Dynamically creates one owner field per SupplyCentre"""
         super().__init__(*args, **kwargs)
 
         self.fields['year'].widget.attrs['size'] = 4
 
-        # Create the right country fields
-        for sc in SupplyCentre.objects.all():
-            self.fields[sc.name] = forms.ModelChoiceField(GreatPower.objects.all(),
-                                                          required=False)
-
 
 class BaseSCOwnerFormset(BaseFormSet):
     """Form to specify who owned which SupplyCentre when for a Game"""
@@ -526,35 +591,28 @@ class BaseSCOwnerFormset(BaseFormSet):
         """
         if any(self.errors):
             return
-        years = []
-        for i in range(0, self.total_form_count()):
-            form = self.forms[i]
+        # Find the form for each year
+        year_forms = {}
+        for form in self.forms:
             year = form.cleaned_data.get('year')
             if not year:
                 # Blank form
                 continue
-            if year in years:
+            if year in year_forms:
                 raise forms.ValidationError(_('Year %(year)s appears more than once')
                                             % {'year': year})
-            years.append(year)
-        years.sort()
+            year_forms[year] = form
+        forms_in_order = [year_forms[year] for year in sorted(year_forms)]
         # Check that SCs never become neutral
-        for sc in SupplyCentre.objects.all():
-            # Find all the listed owners for this dot
-            owners = {}
-            for i in range(0, self.total_form_count()):
-                form = self.forms[i]
-                year = form.cleaned_data.get('year')
-                owner = form.cleaned_data.get(sc.name)
-                owners[year] = (owner, form)
-            # Check through them
+        for sc in get_sc_names():
+            # Check through the listed owners for this dot
             owned = False
-            for key in years:
-                owner, form = owners[key]
+            for form in forms_in_order:
+                owner = form.cleaned_data.get(sc)
                 if owner:
                     owned = True
                 if owned and not owner:
-                    form.add_error(sc.name,
+                    form.add_error(sc,
                                    _('Supply Centres should never change from owned to neutral'))
 
 
@@ -565,56 +623,60 @@ class GameEndedForm(forms.Form):
                                      initial=False)
 
 
-class DeathYearForm(forms.Form):
+class DeathYearForm(DynamicFieldsForm):
     """Form for elimination year of each power"""
 
     # One shared label, because we expect the form to be displayed in a table
     label = forms.CharField(initial=_('Eliminated (optional):'),
                             disabled=True)
 
-    def __init__(self, *args, **kwargs):
-        """Dynamically creates one year field per Great Power"""
-        super().__init__(*args, **kwargs)
+    @classmethod
+    def dynamic_names(cls):
+        """One year field per Great Power"""
+        return get_power_names()
 
-        # Create the right country fields
-        for power in GreatPower.objects.all():
-            c = power.name
-            self.fields[c] = forms.IntegerField(min_value=FIRST_YEAR)
-            self.fields[c].required = False
-            self.fields[c].widget.attrs['size'] = 4
-            self.fields[c].widget.attrs['maxlength'] = 4
+    @classmethod
+    def dynamic_field(cls, name):
+        field = forms.IntegerField(min_value=FIRST_YEAR, required=False)
+        field.widget.attrs['size'] = 4
+        field.widget.attrs['maxlength'] = 4
+        return field
 
 
-class SCCountForm(forms.Form):
+class SCCountForm(DynamicFieldsForm):
     """Form for a Supply Centre count"""
     # Allow for an initial game-start SC count
     year = forms.IntegerField(min_value=FIRST_YEAR-1)
 
+    @classmethod
+    def dynamic_names(cls):
+        """One count field per Great Power"""
+        return get_power_names()
+
+    @classmethod
+    def dynamic_field(cls, name):
+        # TODO It may make sense to use required=False
+        # and to default any not provided to zero
+        # It may also make sense for that default to be in the model...
+        # We don't want the default capitalisation
+        field = forms.IntegerField(min_value=0,
+                                   max_value=TOTAL_SCS,
+                                   label=gettext_lazy(name))
+        field.widget.attrs['size'] = 2
+        field.widget.attrs['maxlength'] = 2
+        return field
+
     def __init__(self, *args, **kwargs):
-        """Dynamically creates one count field per Great Power"""
         super().__init__(*args, **kwargs)
 
         self.fields['year'].widget.attrs['size'] = 4
 
-        # Create the right country fields
-        for power in GreatPower.objects.all():
-            c = power.name
-            # TODO It may make sense to use required=False
-            # and to default any not provided to zero
-            # It may also make sense for that default to be in the model...
-            self.fields[c] = forms.IntegerField(min_value=0, max_value=TOTAL_SCS)
-            # We don't want the default capitalisation
-            self.fields[c].label = _(c)
-            self.fields[c].widget.attrs['size'] = 2
-            self.fields[c].widget.attrs['maxlength'] = 2
-
     def clean(self):
         """Checks that the total SC count is reasonable"""
         cleaned_data = self.cleaned_data
         year = self.cleaned_data.get('year')
         total_scs = 0
-        for power in GreatPower.objects.all():
-            c = power.name
+        for c in self._dynamic_names:
             dots = cleaned_data.get(c)
             # If the field itself didn't validate, drop out
             if dots is None:
@@ -641,9 +703,9 @@ class BaseSCCountFormset(BaseFormSet):
         if any(self.errors):
             return
         years = {}
-        for i in range(0, self.total_form_count()):
-            form = self.forms[i]
-            year = form.cleaned_data.get('year')
+        for form in self.forms:
+            cleaned_data = form.cleaned_data
+            year = cleaned_data.get('year')
             if not year:
                 # Blank form
                 continue
@@ -651,7 +713,7 @@ class BaseSCCountFormset(BaseFormSet):
                 raise forms.ValidationError(_('Year %(year)s appears more than once')
                                             % {'year': year})
             # Remember the number of neutrals left
-            years[year] = form.cleaned_data.get('neutral')
+            years[year] = cleaned_data.get('neutral')
         # Now check that the number of neutrals only goes down
         neutrals = TOTAL_SCS
         for year in sorted(years.keys()):
@@ -725,7 +787,7 @@ class BasePlayerRoundFormset(BaseFormSet):
         """Checks that no player appears more than once"""
         if any(self.errors):
             return
-        players = []
+        players = set()
         for i in range(0, self.total_form_count()):
             form = self.forms[i]
             player = form.cleaned_data.get('player')
@@ -734,7 +796,7 @@ class BasePlayerRoundFormset(BaseFormSet):
             if player in players:
                 raise forms.ValidationError(_('Player %(player)s appears more than once')
                                             % {'player': player})
-            players.append(player)
+            players.add(player)
 
     def __init__(self, *args, **kwargs):
         # Remove our special kwargs from the list
@@ -747,7 +809,13 @@ class BasePlayerRoundFormset(BaseFormSet):
     def _construct_form(self, index, **kwargs):
         # Pass the special args down to the form itself
         kwargs['round_num'] = self.round_num
-        return super()._construct_form(index, **kwargs)
+        form = super()._construct_form(index, **kwargs)
+        # Every form offers the same Players, so only read them once
+        # (iter() stops list() running a COUNT query first)
+        if not hasattr(self, '_player_choices'):
+            self._player_choices = list(iter(form.fields['player'].choices))
+        form.fields['player'].choices = self._player_choices
+        return form
 
 
 class TournamentPlayerChoiceField(forms.ModelChoiceField):
@@ -18,8 +18,10 @@
 Game Views for the Diplomacy Tournament Visualiser.
 """
 
+import re
+
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import Count, Q
 from django.contrib.auth.decorators import permission_required
 from django.core.exceptions import ValidationError
 from django.forms.formsets import formset_factory
@@ -42,11 +44,11 @@ from tournament.forms import SCOwnerForm
 from tournament.tournament_views import get_modifiable_tournament_or_404
 from tournament.tournament_views import get_visible_tournament_or_404
 
-from tournament.diplomacy import GreatPower, SupplyCentre
 from tournament.diplomacy import TOTAL_SCS, WINNING_SCS, FIRST_YEAR
-from tournament.models import Game, GamePlayer, DrawProposal
+from tournament.diplomacy import get_all_powers, get_all_scs
+from tournament.models import Game, GameImage, GamePlayer, DrawProposal
 from tournament.models import SupplyCentreOwnership, CentreCount
-from tournament.models import SPRING
+from tournament.models import FALL, SPRING
 from tournament.models import SCOwnershipsNotFound
 from tournament.news import news
 
@@ -61,9 +63,10 @@ def get_game_or_404(tournament, game_name):
     """
     Return the specified game of the specified tournament or raise Http404.
     """
+    games = Game.objects.select_related('the_round__tournament', 'the_set')
     try:
-        return Game.objects.get(name=game_name,
-                                the_round__tournament=tournament)
+        return games.get(name=game_name,
+                         the_round__tournament=tournament)
     except Game.DoesNotExist as e:
         raise Http404 from e
 
@@ -100,57 +103,54 @@ def game_sc_owners(request,
     """Display the SupplyCentre ownership for a game"""
     t = get_visible_tournament_or_404(tournament_id, request.user)
     g = get_game_or_404(t, game_name)
-    scs = SupplyCentre.objects.all()
+    scs = get_all_scs()
     scos = g.supplycentreownership_set.all()
-    # Create a list of years that have been played, starting with the most recent
-    years = g.years_played()
-    years.reverse()
     context = {'game': g, 'centres': scs}
     # If we don't have ownership data for the current year,
     # and we're refreshing to somewhere else, just move straight along
-    this_year = years[0]
     if (refresh
             and redirect_url_name != 'game_sc_owners_refresh'
-            and not scos.filter(year=this_year).exists()):
+            and not scos.filter(year=g.final_year()).exists()):
         context['rows'] = []
         context['refresh'] = True
         context['redirect_time'] = 0
         context['redirect_url'] = reverse(redirect_url_name,
                                           args=(tournament_id, game_name))
         return render(request, 'games/sc_owners.html', context)
-    set_powers = g.the_set.setpower_set.all()
-    power_to_colour = {}
-    for o in set_powers:
-        power_to_colour[o.power] = o.colour
+    # Create a list of years that have been played, starting with the most recent
+    years = g.years_played()[::-1]
+    # The template only reads the cells, so each distinct cell can be shared
+    owned_cells = {}
+    for o in g.the_set.setpower_set.select_related('power'):
+        owned_cells[o.power_id] = {'color': o.colour,
+                                   'text': _(o.power.abbreviation)}
+    neutral_cell = {'color': 'white', 'text': '-'}
+    unknown_cell = {'color': 'white', 'text': '?'}
+    # Grab all the ownerships in one go, as (centre, owner) ids grouped by year
+    by_year = {}
+    for year, sc_id, owner_id in scos.values_list('year', 'sc_id', 'owner_id'):
+        by_year.setdefault(year, []).append((sc_id, owner_id))
+    # Position of each supply centre's cell in a row (after the year)
+    sc_index = {sc.id: i for i, sc in enumerate(scs, 1)}
     # Create a list of rows, each with a year and each supply centre's owner
     rows = []
     issues = []
     for year in years:
-        yscos = scos.filter(year=year)
-        if not yscos:
+        if year not in by_year:
             # This year we have no data
-            no_data_str = '?'
+            no_data_cell = unknown_cell
         else:
             # No ownership this year implies neutral
-            no_data_str = '-'
-        row = []
-        row.append(year)
-        for sc in scs:
-            try:
-                sco = yscos.get(sc=sc)
-            except SupplyCentreOwnership.DoesNotExist:
-                # This is presumably because the centre was still neutral
-                row.append({'color': 'white', 'text': no_data_str})
-            else:
-                row.append({'color': power_to_colour[sco.owner],
-                            'text': _(sco.owner.abbreviation)})
+            no_data_cell = neutral_cell
+        row = [year] + [no_data_cell] * len(scs)
+        for sc_id, owner_id in by_year.get(year, []):
+            row[sc_index[sc_id]] = owned_cells[owner_id]
         rows.append(row)
-        try:
-            # Check for any problems, and add them to the list
-            issues += g.compare_sc_counts_and_ownerships(year)
-        except SCOwnershipsNotFound:
-            # We have no ownership data for this year, which is fine
-            pass
+        # We have no ownership data for this year, which is fine
+        if year not in by_year:
+            continue
+        # Check for any problems, and add them to the list
+        issues += g.compare_sc_counts_and_ownerships(year)
     context['rows'] = rows
     context['issues'] = issues
     if refresh:
@@ -170,21 +170,28 @@ def game_sc_chart(request,
     #CentreCountFormSet = inlineformset_factory(Game, CentreCount)
     t = get_visible_tournament_or_404(tournament_id, request.user)
     g = get_game_or_404(t, game_name)
-    set_powers = g.the_set.setpower_set.order_by('power')
+    set_powers = g.the_set.setpower_set.order_by('power').select_related('power')
     # TODO Sort set_powers alphabetically by translated power.name
     # Massage ps so we have one entry per power
-    gameplayers = g.gameplayer_set.all()
+    gameplayers = list(g.gameplayer_set.all())
+    # TournamentPlayers for everyone in the game, keyed by player
+    tps = {}
+    tp_qs = t.tournamentplayer_set.filter(player__in=[gp.player_id for gp in gameplayers])
+    for tp in tp_qs.select_related('player'):
+        tps[tp.player_id] = tp
+    # The template links each TournamentPlayer
     ps = []
     for sp in set_powers:
-        power_players = ['<a href="%s">%s</a>'
-                         % (gp.tournamentplayer().get_absolute_url(),
-                            gp.player) for gp in gameplayers.filter(power=sp.power)]
-        names = '<br>'.join(map(str, power_players))
-        ps.append(names)
-    scs = g.centrecount_set.order_by('power', 'year')
+        ps.append([tps[gp.player_id] for gp in gameplayers if gp.power_id == sp.power_id])
+    # Grab all the CentreCounts in one go, keyed by (year, power),
+    # and total up the owned centres for each year as we go
+    cc_map = {}
+    year_totals = {}
+    for year, power_id, count in g.centrecount_set.values_list('year', 'power_id', 'count'):
+        cc_map[(year, power_id)] = count
+        year_totals[year] = year_totals.get(year, 0) + count
     # Create a list of years that have been played, starting with the most recent
-    years = g.years_played()
-    years.reverse()
+    years = sorted(year_totals, reverse=True)
     # Create a list of rows, each with a year and each power's SC count
     rows = []
     # Start with a row with the current scores
@@ -194,16 +201,11 @@ def game_sc_chart(request,
         row.append(scores[sp.power])
     rows.append(row)
     for year in years:
-        yscs = scs.filter(year=year)
         row = []
         row.append(year)
         for sp in set_powers:
-            try:
-                sc = yscs.get(power=sp.power)
-                row.append(sc.count)
-            except CentreCount.DoesNotExist:
-                row.append('?')
-        neutrals = g.neutrals(year)
+            row.append(cc_map.get((year, sp.power_id), '?'))
+        neutrals = TOTAL_SCS - year_totals[year]
         if neutrals == TOTAL_SCS:
             neutrals = '?'
         row.append(neutrals)
@@ -241,40 +243,54 @@ def sc_owners(request, tournament_id, game_name):
     SCOwnerFormset = formset_factory(SCOwnerForm,
                                      extra=_blank_row_num(g, sco_set, final_year),
                                      formset=BaseSCOwnerFormset)
-    # Put in all the existing SupplyCentreOwnerships for this game
-    data = []
+    # Put in all the existing SupplyCentreOwnerships for this game,
+    # grouped by year
+    by_year = {}
     for year in g.years_played():
-        scs = {'year': year}
-        owners = sco_set.filter(year=year)
-        for o in owners:
-            scs[o.sc.name] = o.owner
-        data.append(scs)
+        by_year[year] = {'year': year}
+    for o in sco_set.select_related('sc', 'owner'):
+        if o.year in by_year:
+            by_year[o.year][o.sc.name] = o.owner
+    data = list(by_year.values())
     formset = SCOwnerFormset(request.POST or None, initial=data)
     if formset.is_valid():
-        for form in formset:
-            try:
-                year = form.cleaned_data['year']
-            except KeyError:
-                # Must be one of the extra forms, still blank
-                continue
-            if year is None:
-                continue
-            with transaction.atomic():
+        scs_by_name = {sc.name: sc for sc in get_all_scs()}
+        # Existing SupplyCentreOwnerships, keyed by (year, centre)
+        existing = {}
+        for o in sco_set:
+            existing[(o.year, o.sc_id)] = o
+        with transaction.atomic():
+            for form in formset:
+                try:
+                    year = form.cleaned_data['year']
+                except KeyError:
+                    # Must be one of the extra forms, still blank
+                    continue
+                if year is None:
+                    continue
+                to_create = []
+                to_update = []
+                to_delete = []
                 for name, value in form.cleaned_data.items():
-                    try:
-                        dot = SupplyCentre.objects.get(name=name)
-                    except SupplyCentre.DoesNotExist:
+                    dot = scs_by_name.get(name)
+                    if dot is None:
                         continue
+                    o = existing.get((year, dot.id))
                     if value is None:
                         # Dot is (now) neutral
-                        SupplyCentreOwnership.objects.filter(sc=dot,
-                                                             game=g,
-                                                             year=year).delete()
-                    else:
-                        SupplyCentreOwnership.objects.update_or_create(sc=dot,
-                                                                       game=g,
-                                                                       year=year,
-                                                                       defaults={'owner': value})
+                        if o is not None:
+                            to_delete.append(o.id)
+                    elif o is None:
+                        to_create.append(SupplyCentreOwnership(sc=dot,
+                                                               game=g,
+                                                               year=year,
+                                                               owner=value))
+                    elif o.owner_id != value.id:
+                        o.owner = value
+                        to_update.append(o)
+                SupplyCentreOwnership.objects.filter(id__in=to_delete).delete()
+                SupplyCentreOwnership.objects.bulk_update(to_update, ['owner'])
+                SupplyCentreOwnership.objects.bulk_create(to_create)
                 # Ensure that CentreCounts for this year match
                 try:
                     g.create_or_update_sc_counts_from_ownerships(year)
@@ -302,17 +318,16 @@ def sc_counts(request, tournament_id, game_name):
     SCCountFormset = formset_factory(SCCountForm,
                                      extra=_blank_row_num(g, cc_set, final_year),
                                      formset=BaseSCCountFormset)
-    # Put in all the existing CentreCounts for this game
-    data = []
+    # Put in all the existing CentreCounts for this game,
+    # grouped by year
+    by_year = {}
     death_data = {}
-    for year in g.years_played():
-        scs = {'year': year}
-        counts = cc_set.filter(year=year)
-        for c in counts:
-            scs[c.power.name] = c.count
-            if (c.count == 0) and (c.power.name not in death_data):
-                death_data[c.power.name] = year
-        data.append(scs)
+    for c in cc_set.select_related('power'):
+        by_year.setdefault(c.year, {'year': c.year})[c.power.name] = c.count
+        # CentreCounts are ordered by year, so this finds the first zero
+        if (c.count == 0) and (c.power.name not in death_data):
+            death_data[c.power.name] = c.year
+    data = [by_year[year] for year in sorted(by_year)]
     formset = SCCountFormset(request.POST or None, prefix='scs', initial=data)
     end_form = GameEndedForm(request.POST or None,
                              prefix='end',
@@ -321,6 +336,11 @@ def sc_counts(request, tournament_id, game_name):
                                prefix='death',
                                initial=death_data)
     if formset.is_valid() and end_form.is_valid() and death_form.is_valid():
+        powers_by_name = {p.name: p for p in get_all_powers()}
+        # Existing CentreCounts, keyed by (year, power)
+        existing = {}
+        for cc in g.centrecount_set.all():
+            existing[(cc.year, cc.power_id)] = cc
         try:
             with transaction.atomic():
                 for form in formset:
@@ -329,45 +349,46 @@ def sc_counts(request, tournament_id, game_name):
                     except KeyError:
                         # Must be one of the extra forms, still blank
                         continue
-                    with transaction.atomic():
-                        for name, value in form.cleaned_data.items():
-                            try:
-                                power = GreatPower.objects.get(name=name)
-                            except GreatPower.DoesNotExist:
-                                continue
-                            # Can't use update_or_create() because we need to call full_clean()
-                            try:
-                                i = CentreCount.objects.get(power=power,
-                                                            game=g,
-                                                            year=year)
-                                # Ensure the count has the value we want
-                                i.count = value
-                            except CentreCount.DoesNotExist:
-                                i = CentreCount(power=power,
-                                                game=g,
-                                                year=year,
-                                                count=value)
-                            try:
-                                i.full_clean()
-                            except ValidationError as e:
-                                #form.add_error(name, e)
-                                form.add_error(None, e)
-                                raise e
-                            i.save()
+                    to_create = []
+                    to_update = []
+                    for name, value in form.cleaned_data.items():
+                        power = powers_by_name.get(name)
+                        if power is None:
+                            continue
+                        # Can't use update_or_create() because we need to call full_clean()
+                        i = existing.get((year, power.id))
+                        if i is None:
+                            i = CentreCount(power=power,
+                                            game=g,
+                                            year=year,
+                                            count=value)
+                            to_create.append(i)
+                            existing[(year, power.id)] = i
+                        elif i.count != value:
+                            # Ensure the count has the value we want
+                            i.count = value
+                            to_update.append(i)
+                        try:
+                            i.full_clean()
+                        except ValidationError as e:
+                            #form.add_error(name, e)
+                            form.add_error(None, e)
+                            raise e
+                    # Save each year before moving on,
+                    # because CentreCount.clean() checks against the previous year
+                    CentreCount.objects.bulk_create(to_create)
+                    CentreCount.objects.bulk_update(to_update, ['count'])
 
                 # Add eliminations for any eliminated powers, if needed
                 for name, value in death_form.cleaned_data.items():
                     if value is None:
                         continue
-                    try:
-                        power = GreatPower.objects.get(name=name)
-                    except GreatPower.DoesNotExist:
+                    power = powers_by_name.get(name)
+                    if power is None:
                         continue
-                    try:
-                        i = CentreCount.objects.get(power=power,
-                                                    game=g,
-                                                    year=value)
-                    except CentreCount.DoesNotExist:
+                    i = existing.get((value, power.id))
+                    is_new = i is None
+                    if is_new:
                         # Create a zero-SC count
                         i = CentreCount(power=power,
                                         game=g,
@@ -379,11 +400,16 @@ def sc_counts(request, tournament_id, game_name):
                                                   % {'power': power,
                                                      'count': i.count,
                                                      'year': value})
-                        i.full_clean()
+                        # Anything already in existing was either validated above or
+                        # came from the database (and bulk_create() doesn't set pks,
+                        # so validate_unique() would clash with the row just inserted)
+                        if is_new:
+                            i.full_clean()
                     except ValidationError as e:
                         death_form.add_error(name, e)
                         raise e
-                    i.save()
+                    if is_new:
+                        i.save()
         except ValidationError as e:
             return render(request,
                           'games/sc_counts_form.html',
@@ -466,7 +492,7 @@ def draw_vote(request, tournament_id, game_name):
     form = DrawForm(request.POST or None,
                     dias=g.is_dias(),
                     secrecy=t.draw_secrecy,
-                    player_count=len(g.survivors()),
+                    player_count=len(g.survivors(final_year)),
                     initial={'year': year, 'season': season})
     if form.is_valid():
         year = form.cleaned_data['year']
@@ -517,6 +543,18 @@ def draw_vote(request, tournament_id, game_name):
                    'form': form})
 
 
+def _parse_turn(turn):
+    """
+    Split a turn string like 'S1901M' (as produced by GameImage.turn_str())
+    into a (year, season, phase) 3-tuple, or raise Http404.
+    """
+    phases = {v: k for k, v in GameImage.PHASE_STR.items()}
+    m = re.fullmatch(r'([%s])([1-9][0-9]*)([%s])' % (SPRING + FALL, ''.join(phases)), turn)
+    if m is None:
+        raise Http404
+    return int(m.group(2)), m.group(1), phases[m.group(3)]
+
+
 def game_image(request,
                tournament_id,
                game_name,
@@ -537,7 +575,7 @@ def game_image(request,
         # Always display the latest image
         this_image = g.gameimage_set.last()
         next_image_str = ''
-        this_year = g.years_played()[-1]
+        this_year = g.final_year()
         # If we don't have any image for the current year,
         # and we're refreshing to somewhere else, just move straight along
         if (redirect_url_name != 'game_image_seq'
@@ -545,21 +583,23 @@ def game_image(request,
             refresh_time = 0
     else:
         # Look for the specified image for that game
+        year, season, phase = _parse_turn(turn)
         # And while we're at it, also find the one that follows it
-        # TODO There may be a better way than iterating through all of them...
-        this_image = None
-        all_images = g.gameimage_set.all()
+        # (remembering that spring sorts before fall)
+        images = g.gameimage_set.filter(Q(year__gt=year)
+                                        | Q(year=year, season__lt=season)
+                                        | Q(year=year, season=season, phase__gte=phase))
+        images = list(images[:2])
+        if not images or (images[0].year, images[0].season, images[0].phase) != (year, season, phase):
+            raise Http404
+        this_image = images[0]
         if timelapse:
-            # If there is no "next turn", timelapse should loop back to the first
-            next_image_str = all_images[0].turn_str()
-        for i in all_images:
-            if i.turn_str() == turn:
-                this_image = i
-                if not timelapse:
-                    break
-            elif this_image:
-                next_image_str = i.turn_str()
-                break
+            if len(images) > 1:
+                next_image = images[1]
+            else:
+                # If there is no "next turn", timelapse should loop back to the first
+                next_image = g.gameimage_set.first()
+            next_image_str = next_image.turn_str()
     if not this_image:
         raise Http404
     context = {'tournament': t, 'image': this_image}
@@ -612,11 +652,13 @@ def _bs_ownerships_to_sco(game, year, sc_ownership):
     Update or create SupplyCentreOwnership objects from a backstabbr.Game
     sc_ownership dict.
     """
+    scs_by_abbreviation = {sc.abbreviation.upper(): sc for sc in get_all_scs()}
+    powers_by_abbreviation = {p.abbreviation: p for p in get_all_powers()}
     for k, v in sc_ownership.items():
         # Map k to SupplyCentre (assuming backstabbr.DOTS match SupplyCentre abbreviations)
-        sc = SupplyCentre.objects.get(abbreviation__iexact=k)
+        sc = scs_by_abbreviation[k.upper()]
         # Map v to GreatPower (assuming that backstabbr.POWERS all start with the appropriate abbreviation)
-        power = GreatPower.objects.get(abbreviation=v[0])
+        power = powers_by_abbreviation[v[0]]
         SupplyCentreOwnership.objects.update_or_create(game=game,
                                                        year=year,
                                                        sc=sc,
@@ -627,10 +669,11 @@ def _bs_counts_to_cc(game, year, sc_counts):
     Update or create CentreCount objects from a backstabbr.Game
     sc_counts dict.
     """
+    powers_by_abbreviation = {p.abbreviation: p for p in get_all_powers()}
     with transaction.atomic():
         for k, v in sc_counts.items():
             # Map k to GreatPower (assuming that backstabbr.POWERS all start with the appropriate abbreviation)
-            power = GreatPower.objects.get(abbreviation=k[0])
+            power = powers_by_abbreviation[k[0]]
             CentreCount.objects.update_or_create(power=power,
                                                  game=game,
                                                  year=year,
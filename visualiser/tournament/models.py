@@ -20,31 +20,36 @@ Django models file for the Diplomacy Tournament Visualiser.
 
 from abc import ABC, abstractmethod
 import inspect
-from operator import itemgetter
+from operator import attrgetter, itemgetter
 import os
 import random
 import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models import Sum, Max
+from django.db.models import Count, Sum, Max
+from django.db.models.signals import post_delete, post_save
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.utils.translation import ngettext
 
 from tournament.background import WDD_BASE_URL
-from tournament.diplomacy import GameSet, GreatPower, SupplyCentre
+from tournament.diplomacy import GameSet, GreatPower, SetPower, SupplyCentre
 from tournament.diplomacy import FIRST_YEAR, WINNING_SCS, TOTAL_SCS
 from tournament.diplomacy import validate_year_including_start, validate_year
 from tournament.diplomacy import validate_ranking, validate_preference_string
+from tournament.diplomacy import get_all_powers
 from tournament.email import send_prefs_email
 from tournament.game_scoring import G_SCORING_SYSTEMS, GameScoringSystem
 from tournament.players import Player, add_player_bg
+from tournament.players import PlayerAward, PlayerGameResult, PlayerRanking, PlayerTournamentRanking
 from tournament.players import MASK_ALL_BG, MASK_ROUND_ENDPOINTS
 from tournament.players import validate_wdd_tournament_id
+from tournament.reverse_cached import reverse_cached
 from tournament.tournament_game_state import TournamentGameState
 
 SPRING = 'S'
@@ -87,6 +92,27 @@ class InvalidPowerAssignmentMethod(Exception):
     pass
 
 
+class PageCacheQuerySet(models.QuerySet):
+    """
+    QuerySet that discards the cached tournament pages after bulk writes,
+    which don't send the post_save signal that normally does that.
+    """
+    def bulk_create(self, *args, **kwargs):
+        ret = super().bulk_create(*args, **kwargs)
+        clear_page_cache(self.model)
+        return ret
+
+    def bulk_update(self, *args, **kwargs):
+        ret = super().bulk_update(*args, **kwargs)
+        clear_page_cache(self.model)
+        return ret
+
+    def update(self, **kwargs):
+        ret = super().update(**kwargs)
+        clear_page_cache(self.model)
+        return ret
+
+
 class RoundScoringSystem(ABC):
     """
     A scoring system for a Round.
@@ -609,8 +635,9 @@ class Tournament(models.Model):
         """
         Return the Round (if any) of the tournament with the specified number.
         """
-        for r in self.round_set.all():
-            if r.number() == int(number):
+        # Rounds are numbered in their default order, from 1
+        for i, r in enumerate(self.round_set.all(), 1):
+            if i == int(number):
                 return r
         # This allows this function to be used like QuerySet.get()
         raise Round.DoesNotExist
@@ -729,7 +756,7 @@ class Tournament(models.Model):
 
     def get_absolute_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('tournament_detail', args=[str(self.id)])
+        return reverse_cached('tournament_detail', args=[str(self.id)])
 
     def __str__(self):
         return '%s %d' % (self.name, self.start_date.year)
@@ -787,15 +814,17 @@ class TournamentPlayer(models.Model):
             validate_preference_string(the_string)
         except ValidationError as e:
             raise InvalidPreferenceList from e
-        # Remove any existing preferences for this player
-        self.preference_set.all().delete()
         to_power = {}
-        for p in GreatPower.objects.all():
+        for p in get_all_powers():
             to_power[p.abbreviation] = p
-        # Go through the string, creating Preferences
         with transaction.atomic():
+            # Remove any existing preferences for this player
+            self.preference_set.all().delete()
+            # Go through the string, creating Preferences in one go
+            prefs = []
             for i, c in enumerate(the_string, 1):
-                Preference.objects.create(player=self, power=to_power[c], ranking=i)
+                prefs.append(Preference(player=self, power=to_power[c], ranking=i))
+            Preference.objects.bulk_create(prefs)
 
     def prefs_string(self):
         """
@@ -835,8 +864,8 @@ class TournamentPlayer(models.Model):
 
     def get_absolute_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('tournament_player_detail', args=[str(self.tournament.id),
-                                                         str(self.id)])
+        return reverse_cached('tournament_player_detail',
+                              args=[str(self.tournament.id), str(self.id)])
 
     def __str__(self):
         return _('%(player)s at %(tourney)s') % {'tourney': self.tournament,
@@ -917,6 +946,8 @@ class Preference(models.Model):
     power = models.ForeignKey(GreatPower, on_delete=models.CASCADE)
     ranking = models.PositiveSmallIntegerField(validators=[validate_ranking])
 
+    objects = PageCacheQuerySet.as_manager()
+
     class Meta:
         # Each player can only have one ranking per power
         unique_together = (('player', 'power'),
@@ -1065,8 +1096,8 @@ class Round(models.Model):
 
     def get_absolute_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('round_detail',
-                       args=[str(self.tournament.id), str(self.number())])
+        return reverse_cached('round_detail',
+                              args=[str(self.tournament.id), str(self.number())])
 
     def __str__(self):
         return _(u'%(tournament)s round %(round)d') % {'tournament': self.tournament,
@@ -1189,16 +1220,18 @@ class Game(models.Model):
         Can raise SCOwnershipsNotFound.
         """
         all_scos = self.supplycentreownership_set.filter(year=year)
-        if not all_scos.exists():
+        # Count the centres owned by each power, keyed by power id, in one query
+        owned = dict(all_scos.order_by().values_list('owner').annotate(Count('id')))
+        if not owned:
             raise SCOwnershipsNotFound('%d of game %s' % (year, str(self)))
+        ccs = {}
+        for cc in self.centrecount_set.filter(year=year):
+            ccs[cc.power_id] = cc
         retval = []
-        for p in GreatPower.objects.all():
-            sco_dots = all_scos.filter(owner=p).count()
-            try:
-                cc = CentreCount.objects.get(power=p,
-                                             game=self,
-                                             year=year)
-            except CentreCount.DoesNotExist:
+        for p in get_all_powers():
+            sco_dots = owned.get(p.pk, 0)
+            cc = ccs.get(p.pk)
+            if cc is None:
                 retval.append(_('Missing count of %(dots)d centre(s) for %(power)s')
                               % {'dots': sco_dots,
                                  'power': p})
@@ -1334,7 +1367,7 @@ class Game(models.Model):
             year = final_year
         if year > final_year:
             year = final_year
-        final_scs = self.centrecount_set.filter(year=year)
+        final_scs = self.centrecount_set.filter(year=year).select_related('power')
         return [sc for sc in final_scs if sc.count > 0]
 
     def result_str(self, include_game_name=False):
@@ -1442,8 +1475,8 @@ class Game(models.Model):
 
     def get_absolute_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('game_detail',
-                       args=[str(self.the_round.tournament.id), self.name])
+        return reverse_cached('game_detail',
+                              args=[str(self.the_round.tournament.id), self.name])
 
     def __str__(self):
         return _('%(game)s at %(tourney)s') % {'game': self.name,
@@ -1460,6 +1493,8 @@ class SupplyCentreOwnership(models.Model):
     sc = models.ForeignKey(SupplyCentre, on_delete=models.CASCADE)
     owner = models.ForeignKey(GreatPower, on_delete=models.CASCADE)
 
+    objects = PageCacheQuerySet.as_manager()
+
     class Meta:
         unique_together = ('sc', 'game', 'year')
         ordering = ['game', 'year']
@@ -1529,11 +1564,12 @@ class DrawProposal(models.Model):
         """
         Returns a list of powers included in the draw proposal.
         """
+        powers = {p.pk: p for p in get_all_powers()}
         retval = []
         for name, value in self.__dict__.items():
             if name.startswith('power_'):
                 if value:
-                    retval.append(GreatPower.objects.get(pk=value))
+                    retval.append(powers[value])
         return retval
 
     def power_is_part(self, power):
@@ -1676,6 +1712,8 @@ class RoundPlayer(models.Model):
     game_count = models.PositiveIntegerField(default=1,
                                              help_text=_('number of games being played this round'))
 
+    objects = PageCacheQuerySet.as_manager()
+
     class Meta:
         ordering = ['player', 'the_round__start']
         unique_together = ('player', 'the_round')
@@ -1721,6 +1759,8 @@ class GamePlayer(models.Model):
     after_action_report = models.TextField(blank=True,
                                            help_text=_("This player's account of the game"))
 
+    objects = PageCacheQuerySet.as_manager()
+
     class Meta:
         ordering = ['game', 'power']
         unique_together = ('player', 'game')
@@ -1769,9 +1809,11 @@ class GamePlayer(models.Model):
         in the player's priority list for the tournament.
         """
         prefs = self.preferences()
-        gps = self.game.gameplayer_set.all()
-        for p in prefs:
-            if gps.filter(power=p.power).exists():
+        # Read the powers already taken in this game just once
+        gps = self.game.gameplayer_set.filter(power__isnull=False)
+        used_power_ids = set(gps.values_list('power_id', flat=True))
+        for p in prefs.select_related('power'):
+            if p.power_id in used_power_ids:
                 # This power is already taken - on to the next
                 continue
             # Found a power that isn't taken
@@ -1779,10 +1821,7 @@ class GamePlayer(models.Model):
             break
         if self.power is None:
             # No preferences left, so pick a power at random from the unassigned ones
-            used_powers = [gp.power for gp in gps.filter(power__isnull=False)]
-            free_powers = list(GreatPower.objects.all())
-            for p in used_powers:
-                free_powers.remove(p)
+            free_powers = [p for p in get_all_powers() if p.pk not in used_power_ids]
             random.shuffle(free_powers)
             self.power = free_powers[0]
         assert self.power is not None
@@ -1795,41 +1834,49 @@ class GamePlayer(models.Model):
         Returned string includes an HTML <a> link to the game details page.
         """
         g = self.game
-        cc_set = g.centrecount_set.all()
-        power_cc_set = cc_set.filter(power=self.power)
+        if include_power:
+            power_name = _(self.power.name)
+        # Work from one list of the Game's CentreCounts,
+        # which will already be in memory if they were prefetched
+        cc_set = list(g.centrecount_set.all())
+        power_cc_set = [cc for cc in cc_set if cc.power_id == self.power_id]
         # Final CentreCount for this player in this game
-        final_sc = power_cc_set.order_by('-year').first()
+        final_sc = max(power_cc_set, key=attrgetter('year'))
         if final_sc.count == 0:
             # We need to look back to find the first CentreCount with no dots
-            final_sc = power_cc_set.filter(count=0).order_by('year').first()
+            final_sc = min([cc for cc in power_cc_set if cc.count == 0],
+                           key=attrgetter('year'))
             if include_power:
                 gs = _('Eliminated as %(power)s in %(year)d') % {'year': final_sc.year,
-                                                                 'power': _(self.power.name)}
+                                                                 'power': power_name}
             else:
                 gs = _('Eliminated in %(year)d') % {'year': final_sc.year}
         else:
             # Final year of the game as a whole
-            final_year = cc_set.order_by('-year').first().year
+            final_year = max(cc.year for cc in cc_set)
             # Was the game soloed ?
-            soloer = g.soloer()
-            if self == soloer:
+            soloer_power_id = None
+            for cc in cc_set:
+                if cc.count >= WINNING_SCS:
+                    soloer_power_id = cc.power_id
+            if soloer_power_id == self.power_id:
                 if include_power:
                     gs = ngettext('Solo as %(power)s with %(dots)d centre in %(year)d',
                                   'Solo as %(power)s with %(dots)d centres in %(year)d',
                                   final_sc.count) % {'year': final_year,
-                                                     'power': _(self.power.name),
+                                                     'power': power_name,
                                                      'dots': final_sc.count}
                 else:
                     gs = ngettext('Solo with %(dots)d centre in %(year)d',
                                   'Solo with %(dots)d centres in %(year)d',
                                   final_sc.count) % {'year': final_year,
                                                      'dots': final_sc.count}
-            elif soloer is not None:
+            elif soloer_power_id is not None:
                 if include_power:
                     gs = ngettext('Loss as %(power)s with %(dots)d centre in %(year)d',
                                   'Loss as %(power)s with %(dots)d centres in %(year)d',
                                   final_sc.count) % {'year': final_sc.year,
-                                                     'power': _(self.power.name),
+                                                     'power': power_name,
                                                      'dots': final_sc.count}
                 else:
                     gs = ngettext('Loss with %(dots)d centre in %(year)d',
@@ -1838,20 +1885,25 @@ class GamePlayer(models.Model):
                                                      'dots': final_sc.count}
             else:
                 # Did a draw vote pass ?
-                res = g.passed_draw()
+                # (checked in Python, so that prefetched DrawProposals are used)
+                res = None
+                for dp in g.drawproposal_set.all():
+                    if dp.passed:
+                        res = dp
                 if res:
-                    if self.power in res.powers():
+                    draw_powers = res.powers()
+                    if self.power in draw_powers:
                         if include_power:
                             gs = ngettext('%(n)d-way draw as %(power)s with %(dots)d centre in %(year)d',
                                           '%(n)d-way draw as %(power)s with %(dots)d centres in %(year)d',
-                                          final_sc.count) % {'n': res.draw_size(),
-                                                             'power': _(self.power.name),
+                                          final_sc.count) % {'n': len(draw_powers),
+                                                             'power': power_name,
                                                              'dots': final_sc.count,
                                                              'year': final_year}
                         else:
                             gs = ngettext('%(n)d-way draw with %(dots)d centre in %(year)d',
                                           '%(n)d-way draw with %(dots)d centres in %(year)d',
-                                          final_sc.count) % {'n': res.draw_size(),
+                                          final_sc.count) % {'n': len(draw_powers),
                                                              'dots': final_sc.count,
                                                              'year': final_year}
                     else:
@@ -1859,7 +1911,7 @@ class GamePlayer(models.Model):
                             gs = ngettext('Loss as %(power)s with %(dots)d centre in %(year)d',
                                           'Loss as %(power)s with %(dots)d centres in %(year)d',
                                           final_sc.count) % {'year': final_sc.year,
-                                                             'power': _(self.power.name),
+                                                             'power': power_name,
                                                              'dots': final_sc.count}
                         else:
                             gs = ngettext('Loss with %(dots)d centre in %(year)d',
@@ -1869,10 +1921,10 @@ class GamePlayer(models.Model):
                 else:
                     # Game is either ongoing or reached a timed end
                     # Is this power topping the board?
-                    final_sc_set = cc_set.filter(year=final_sc.year).order_by('-count')
-                    topper_dots = final_sc_set.first().count
+                    final_sc_set = [cc.count for cc in cc_set if cc.year == final_sc.year]
+                    topper_dots = max(final_sc_set)
                     if final_sc.count == topper_dots:
-                        topper_count = final_sc_set.filter(count=topper_dots).count()
+                        topper_count = final_sc_set.count(topper_dots)
                         topper_str = ngettext(' (board top)',
                                               ' (%(n)d-way tied board top)',
                                               topper_count) % {'n': topper_count}
@@ -1882,7 +1934,7 @@ class GamePlayer(models.Model):
                         gs = ngettext('%(dots)d centre%(topper)s as %(power)s in %(year)d',
                                       '%(dots)d centres%(topper)s as %(power)s in %(year)d',
                                       final_sc.count) % {'year': final_sc.year,
-                                                         'power': _(self.power.name),
+                                                         'power': power_name,
                                                          'topper': topper_str,
                                                          'dots': final_sc.count}
                     else:
@@ -1922,9 +1974,9 @@ class GamePlayer(models.Model):
 
     def get_aar_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('aar', args=[str(self.game.the_round.tournament.id),
-                                        self.game.name,
-                                        self.player.id])
+        return reverse_cached('aar', args=[str(self.game.the_round.tournament.id),
+                                           self.game.name,
+                                           self.player.id])
 
 
 class GameImage(models.Model):
@@ -1978,9 +2030,9 @@ class GameImage(models.Model):
 
     def get_absolute_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('game_image', args=[str(self.game.the_round.tournament.id),
-                                           self.game.name,
-                                           self.turn_str()])
+        return reverse_cached('game_image', args=[str(self.game.the_round.tournament.id),
+                                                  self.game.name,
+                                                  self.turn_str()])
 
     def __str__(self):
         return _(u'%(game)s %(turn)s image') % {'game': self.game,
@@ -1996,6 +2048,8 @@ class CentreCount(models.Model):
     year = models.PositiveSmallIntegerField(validators=[validate_year_including_start])
     count = models.PositiveSmallIntegerField(validators=[validate_sc_count])
 
+    objects = PageCacheQuerySet.as_manager()
+
     class Meta:
         unique_together = ('power', 'game', 'year')
         ordering = ['game', 'year']
@@ -2033,3 +2087,25 @@ class CentreCount(models.Model):
         return u'%(game)s %(year)d %(power)s' % {'game': self.game,
                                                  'year': self.year,
                                                  'power': _(self.power.abbreviation)}
+
+
+def clear_page_cache(sender, **kwargs):
+    """
+    Discards all the cached tournament pages when any tournament data changes.
+    We can't tell which pages show a given object, so it's all or nothing.
+    Waits for any current transaction to commit, so that a concurrent request
+    can't re-cache a page built from the old data.
+    """
+    transaction.on_commit(caches['pages'].clear)
+
+
+# Only connected to the tournament models, so that Django can still
+# fast-delete rows of other apps' models
+for _model in (GreatPower, GameSet, SetPower, SupplyCentre,
+               Player, PlayerTournamentRanking, PlayerGameResult,
+               PlayerAward, PlayerRanking,
+               Tournament, TournamentPlayer, SeederBias, Preference,
+               Round, PowerBid, Game, SupplyCentreOwnership, DrawProposal,
+               RoundPlayer, GamePlayer, GameImage, CentreCount):
+    post_save.connect(clear_page_cache, sender=_model)
+    post_delete.connect(clear_page_cache, sender=_model)
@@ -53,9 +53,10 @@ def player_detail(request, pk):
         # Redirect back here to flush the POST data
         return HttpResponseRedirect(reverse('player_detail',
                                             args=(pk,)))
+    tps = player.tournamentplayers().select_related('tournament')
     return render(request,
                   'players/detail.html',
-                  {'player': player})
+                  {'player': player, 'tournamentplayers': tps})
 
 
 @permission_required('tournament.add_player')
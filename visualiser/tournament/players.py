@@ -35,12 +35,12 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Max, Min, Q
-from django.urls import reverse
 from django.utils.translation import gettext as _
 
 from tournament.background import WikipediaBackground, WDDBackground, WDD_BASE_URL
 from tournament.background import InvalidWDDId, WDDNotAccessible
 from tournament.diplomacy import WINNING_SCS, GreatPower, validate_year
+from tournament.reverse_cached import reverse_cached
 
 # These happen to co-incide with the coding used by the WDD
 WIN = 'W'
@@ -696,7 +696,7 @@ class Player(models.Model):
 
     def get_absolute_url(self):
         """Returns the canonical URL for the object."""
-        return reverse('player_detail', args=[str(self.id)])
+        return reverse_cached('player_detail', args=[str(self.id)])
 
 
 class PlayerTournamentRanking(models.Model):
@@ -0,0 +1,45 @@
+# Diplomacy Tournament Visualiser
+# Copyright (C) 2022 Chris Brand
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module provides a memoised version of django.urls.reverse().
+"""
+
+from functools import lru_cache
+
+from django.urls import get_script_prefix, reverse
+
+
+@lru_cache(maxsize=4096)
+def _reverse(prefix, viewname, args, kwargs_items):
+    """
+    Calls reverse(). prefix is only there to be part of the cache key,
+    because reverse() prepends the script prefix to the URL it returns.
+    """
+    return reverse(viewname, args=args, kwargs=dict(kwargs_items))
+
+
+def reverse_cached(viewname, args=None, kwargs=None):
+    """
+    Equivalent to reverse(viewname, args=args, kwargs=kwargs),
+    but remembers the result for the next call with the same arguments.
+    The URLConf doesn't change once it's been loaded, so nothing needs to
+    be invalidated. args and the values in kwargs must be hashable.
+    """
+    return _reverse(get_script_prefix(),
+                    viewname,
+                    tuple(args or ()),
+                    tuple(sorted((kwargs or {}).items())))
@@ -22,7 +22,8 @@ import csv
 
 from django.contrib.auth.decorators import permission_required
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Prefetch, Sum
 from django.forms.formsets import formset_factory
 from django.http import Http404, HttpResponseRedirect, HttpResponse
 from django.shortcuts import render
@@ -42,9 +43,10 @@ from tournament.tournament_views import get_modifiable_tournament_or_404
 from tournament.tournament_views import get_visible_tournament_or_404
 
 from tournament.diplomacy import GreatPower, GameSet
+from tournament.diplomacy import get_all_powers
 from tournament.email import send_board_call
 from tournament.game_seeder import GameSeeder
-from tournament.models import Tournament, Round, Game
+from tournament.models import Tournament, Round, Game, SeederBias
 from tournament.models import TournamentPlayer, RoundPlayer, GamePlayer
 
 # Round views
@@ -134,14 +136,16 @@ def roll_call(request, tournament_id, round_num):
     r = get_round_or_404(t, round_num)
     round_set = t.round_set.filter(pk=r.pk)
     player_data = []
+    # Grab all the RoundPlayers for this round in one go, keyed by player
+    rps = {}
+    for rp in r.roundplayer_set.all():
+        rps[rp.player_id] = rp
     # Go through each player in the Tournament
-    for tp in t.tournamentplayer_set.all():
+    for tp in t.tournamentplayer_set.select_related('player'):
         current = {'player': tp.player}
-        rps = tp.roundplayers()
         # Is this player listed as playing this round ?
-        try:
-            rp = rps.get(the_round=r)
-        except RoundPlayer.DoesNotExist:
+        rp = rps.get(tp.player_id)
+        if rp is None:
             current['present'] = False
             current['standby'] = False
         else:
@@ -154,32 +158,37 @@ def roll_call(request, tournament_id, round_num):
                                  initial=player_data)
     if formset.is_valid():
         errors_added = False
-        for form in formset:
-            try:
-                p = form.cleaned_data['player']
-            except KeyError:
-                # This must be one of the extra forms, still empty
-                continue
-            # Ensure that this Player is in the Tournament
-            TournamentPlayer.objects.get_or_create(player=p,
-                                                   tournament=t)
-            if form.cleaned_data['present'] is True:
-                # Ensure that we have a corresponding RoundPlayer
-                is_standby = form.cleaned_data['standby']
-                RoundPlayer.objects.update_or_create(player=p,
-                                                     the_round=r,
-                                                     # Reset game_count in case we've been here before
-                                                     defaults={'game_count': 0 if is_standby else 1,
-                                                               'standby': is_standby})
-            elif r.game_set.filter(gameplayer__player=p).exists():
-                # Refuse to delete this one
-                form.add_error(None, _('Player did play this round'))
-                errors_added = True
-            else:
-                # delete any corresponding RoundPlayer
-                # This could be a player who was previously checked-off in error
-                RoundPlayer.objects.filter(player=p,
-                                           the_round=r).delete()
+        tp_player_ids = set(t.tournamentplayer_set.values_list('player_id', flat=True))
+        gp_player_ids = set(GamePlayer.objects.filter(game__the_round=r).values_list('player_id', flat=True))
+        with transaction.atomic():
+            for form in formset:
+                try:
+                    p = form.cleaned_data['player']
+                except KeyError:
+                    # This must be one of the extra forms, still empty
+                    continue
+                # Ensure that this Player is in the Tournament
+                if p.pk not in tp_player_ids:
+                    TournamentPlayer.objects.create(player=p,
+                                                    tournament=t)
+                    tp_player_ids.add(p.pk)
+                if form.cleaned_data['present'] is True:
+                    # Ensure that we have a corresponding RoundPlayer
+                    is_standby = form.cleaned_data['standby']
+                    RoundPlayer.objects.update_or_create(player=p,
+                                                         the_round=r,
+                                                         # Reset game_count in case we've been here before
+                                                         defaults={'game_count': 0 if is_standby else 1,
+                                                                   'standby': is_standby})
+                elif p.pk in gp_player_ids:
+                    # Refuse to delete this one
+                    form.add_error(None, _('Player did play this round'))
+                    errors_added = True
+                else:
+                    # delete any corresponding RoundPlayer
+                    # This could be a player who was previously checked-off in error
+                    RoundPlayer.objects.filter(player=p,
+                                               the_round=r).delete()
         if not errors_added:
             r = t.current_round()
             # we only want to seed boards if it's the current round
@@ -233,28 +242,35 @@ def get_seven(request, tournament_id, round_num):
                                the_round=r)
     if form.is_valid():
         # Update RoundPlayers to indicate number of games they're playing
+        # Work out the new game_counts, keyed by RoundPlayer pk
         # First clear any old game_counts
-        for rp in rps.all():
+        game_counts = {}
+        all_rps = list(rps.all())
+        for rp in all_rps:
             if rp.standby and not form.all_standbys_needed:
-                rp.game_count = 0
+                game_counts[rp.pk] = 0
             else:
-                rp.game_count = 1
-            rp.save()
+                game_counts[rp.pk] = 1
         for i in range(form.standbys):
             rp = form.cleaned_data['standby_%d' % i]
             if rp:
-                rp.game_count = 1
-                rp.save()
+                game_counts[rp.pk] = 1
         for i in range(form.sitters):
             rp = form.cleaned_data['sitter_%d' % i]
             if rp:
-                rp.game_count = 0
-                rp.save()
+                game_counts[rp.pk] = 0
         for i in range(form.doubles):
             rp = form.cleaned_data['double_%d' % i]
             if rp:
-                rp.game_count = 2
-                rp.save()
+                game_counts[rp.pk] = 2
+        # Then write just the ones that changed, in a single query
+        changed = []
+        for rp in all_rps:
+            if rp.game_count != game_counts[rp.pk]:
+                rp.game_count = game_counts[rp.pk]
+                changed.append(rp)
+        if changed:
+            RoundPlayer.objects.bulk_update(changed, ['game_count'])
         return HttpResponseRedirect(reverse('seed_games',
                                             args=(tournament_id,
                                                   round_num)))
@@ -266,24 +282,28 @@ def get_seven(request, tournament_id, round_num):
 
 def _sitters_and_two_gamers(tournament, the_round):
     """ Return a (sitters, two_gamers) 2-tuple"""
-    tourney_players = tournament.tournamentplayer_set.all()
+    # Keyed by Player id, so we can find each RoundPlayer's TournamentPlayer
+    tourney_players = {}
+    for tp in tournament.tournamentplayer_set.all():
+        tourney_players[tp.player_id] = tp
     round_players = the_round.roundplayer_set.all()
+    gp_player_ids = set(GamePlayer.objects.filter(game__the_round=the_round).values_list('player_id', flat=True))
     # Get the set of players that haven't already been assigned to games for this round
     rps = []
     sitters = set()
     two_gamers = set()
     for rp in round_players:
-        assert rp.gameplayers().count() == 0, "%d games already exist for %s in this round" % (rp.gameplayers().count(),
-                                                                                               str(rp))
+        assert rp.player_id not in gp_player_ids, "%d games already exist for %s in this round" % (rp.gameplayers().count(),
+                                                                                                   str(rp))
         rps.append(rp)
         if rp.game_count == 1:
             continue
         elif rp.game_count == 0:
             # This player is sitting out this round
-            sitters.add(rp.tournamentplayer())
+            sitters.add(tourney_players[rp.player_id])
         elif rp.game_count == 2:
             # This player is playing two games this round
-            two_gamers.add(rp.tournamentplayer())
+            two_gamers.add(tourney_players[rp.player_id])
         else:
             assert 0, 'Unexpected game_count value %d for %s' % (rp.game_count, str(rp))
     assert (not sitters) or (not two_gamers)
@@ -294,38 +314,43 @@ def _sitters_and_two_gamers(tournament, the_round):
         # Check that we have the right number of players playing two games
         assert (len(rps) + len(two_gamers)) % 7 == 0
     # We also need to flag any players who aren't present for this round as sitting out
-    for tp in tourney_players:
-        if not round_players.filter(player=tp.player).exists():
+    rp_player_ids = set(rp.player_id for rp in rps)
+    for player_id, tp in tourney_players.items():
+        if player_id not in rp_player_ids:
             sitters.add(tp)
     return sitters, two_gamers
 
 
 def _create_game_seeder(tournament, round_number):
     """Return a GameSeeder that knows about the tournament so far"""
-    tourney_players = tournament.tournamentplayer_set.all()
+    # Keyed by Player id, so we can find each GamePlayer's TournamentPlayer
+    tourney_players = {}
+    for tp in tournament.tournamentplayer_set.all():
+        tourney_players[tp.player_id] = tp
     # Create the game seeder
     seeder = GameSeeder(GreatPower.objects.all(),
                         starts=100,
                         iterations=10)
     # Tell the seeder about every player in the tournament
     # (regardless of whether they're playing this round - they may have played already)
-    for tp in tourney_players:
+    for tp in tourney_players.values():
         seeder.add_player(tp)
     # Provide details of games already played this tournament
-    for n in range(1, round_number):
-        rnd = tournament.round_numbered(n)
-        for g in rnd.game_set.all():
-            game = set()
-            for gp in g.gameplayer_set.all():
-                game.add((gp.tournamentplayer(), gp.power))
-            assert len(game) == 7
-            seeder.add_played_game(game)
+    # Rounds are numbered in their default order, from 1
+    earlier_rounds = list(tournament.round_set.all())[:round_number - 1]
+    games = Game.objects.filter(the_round__in=earlier_rounds)
+    gps = GamePlayer.objects.select_related('power')
+    for g in games.prefetch_related(Prefetch('gameplayer_set', queryset=gps)):
+        game = set()
+        for gp in g.gameplayer_set.all():
+            game.add((tourney_players[gp.player_id], gp.power))
+        assert len(game) == 7
+        seeder.add_played_game(game)
     # Add in any biases now that all players have been added
-    for tp in tourney_players:
-        # Just use seederbias_set so we only get each SeederBias once
-        # because we only look at their player1
-        for sb in tp.seederbias_set.all():
-            seeder.add_bias(sb.player1, sb.player2, sb.weight)
+    # Just use player1 so we only get each SeederBias once
+    biases = SeederBias.objects.filter(player1__tournament=tournament)
+    for sb in biases.select_related('player1', 'player2'):
+        seeder.add_bias(sb.player1, sb.player2, sb.weight)
     return seeder
 
 
@@ -363,32 +388,43 @@ def seed_games(request, tournament_id, round_num):
                                              extra=0)
         formset = PowerAssignFormset(request.POST, the_round=r)
         if formset.is_valid():
-            for f in formset:
-                # Update the game
-                g = f.game
-                g.name = f.cleaned_data['name']
-                g.the_set = f.cleaned_data['the_set']
-                g.notes = f.cleaned_data['notes']
-                try:
-                    g.full_clean()
-                except ValidationError as e:
-                    f.add_error(None, e)
-                    return render(request,
-                                  'rounds/seeded_games.html',
-                                  {'tournament': t,
-                                   'round': r,
-                                   'formset': formset})
-                g.save()
-                # Unassign all GreatPowers first,
-                # so we never have two players for one power
-                g.gameplayer_set.all().update(power=None)
-                # Assign the powers to the players
-                for gp_id, field in f.cleaned_data.items():
-                    if gp_id in ['the_set', 'name', 'notes']:
-                        continue
-                    gp = GamePlayer.objects.get(id=gp_id)
-                    gp.power = field
-                    gp.save()
+            # Grab all the GamePlayers for the round in one go, keyed by id
+            gps = {}
+            for gp in GamePlayer.objects.filter(game__the_round=r):
+                gps[gp.id] = gp
+            try:
+                with transaction.atomic():
+                    for f in formset:
+                        # Update the game
+                        g = f.game
+                        g.name = f.cleaned_data['name']
+                        g.the_set = f.cleaned_data['the_set']
+                        g.notes = f.cleaned_data['notes']
+                        try:
+                            g.full_clean()
+                        except ValidationError as e:
+                            f.add_error(None, e)
+                            # Roll back any games already saved
+                            raise e
+                        g.save()
+                        # Unassign all GreatPowers first,
+                        # so we never have two players for one power
+                        g.gameplayer_set.all().update(power=None)
+                        # Assign the powers to the players
+                        changed = []
+                        for gp_id, field in f.cleaned_data.items():
+                            if gp_id in ['the_set', 'name', 'notes']:
+                                continue
+                            gp = gps[gp_id]
+                            gp.power = field
+                            changed.append(gp)
+                        GamePlayer.objects.bulk_update(changed, ['power'])
+            except ValidationError:
+                return render(request,
+                              'rounds/seeded_games.html',
+                              {'tournament': t,
+                               'round': r,
+                               'formset': formset})
             # Notify the players
             send_board_call(r)
             # Redirect to the board call page
@@ -410,43 +446,34 @@ def seed_games(request, tournament_id, round_num):
             default_set = GameSet.objects.get(name='Backstabbr')
         else:
             default_set = GameSet.objects.get(pk=1)
-        data = []
-        # Generate a seeding, and assign powers if required
-        if t.power_assignment == Tournament.AUTO:
-            games = _seed_games_and_powers(t, r)
-            # Add the Games and GamePlayers to the database
-            for i, g in enumerate(games, start=1):
-                new_game = Game.objects.create(name=_generate_game_name(round_num, i),
-                                               the_round=r,
-                                               the_set=default_set)
-                current = {'name': new_game.name,
-                           'the_set': new_game.the_set}
-                for tp, power in g:
-                    gp = GamePlayer.objects.create(player=tp.player,
-                                                   game=new_game,
-                                                   power=power)
-                    current[gp.id] = power
-                data.append(current)
-        else:
-            games = _seed_games(t, r)
+        with transaction.atomic():
+            # Generate a seeding, and assign powers if required
+            if t.power_assignment == Tournament.AUTO:
+                games = _seed_games_and_powers(t, r)
+            else:
+                games = [[(tp, None) for tp in g] for g in _seed_games(t, r)]
             # Add the Games and GamePlayers to the database
+            # Game.save() does extra work, so the Games have to be created one at a time
+            new_games = []
             for i, g in enumerate(games, start=1):
                 new_game = Game.objects.create(name=_generate_game_name(round_num, i),
                                                the_round=r,
                                                the_set=default_set)
-                current = {'name': new_game.name,
-                           'the_set': new_game.the_set}
-                for tp in g:
-                    gp = GamePlayer.objects.create(player=tp.player,
-                                                   game=new_game)
+                new_games.append(new_game)
+                GamePlayer.objects.bulk_create([GamePlayer(player=tp.player,
+                                                           game=new_game,
+                                                           power=power) for tp, power in g])
                 # If we're assigning powers from preferences, do so now
                 if t.power_assignment == Tournament.PREFERENCES:
                     new_game.assign_powers_from_prefs()
-                for tp in g:
-                    gp = GamePlayer.objects.get(player=tp.player,
-                                                game=new_game)
-                    current[gp.id] = gp.power
-                data.append(current)
+        # bulk_create() doesn't set the ids on every database, so read them all back in one go
+        game_data = {}
+        for new_game in new_games:
+            game_data[new_game.id] = {'name': new_game.name,
+                                      'the_set': new_game.the_set}
+        for gp in GamePlayer.objects.filter(game__in=new_games).select_related('power'):
+            game_data[gp.game_id][gp.id] = gp.power
+        data = list(game_data.values())
         # Create a form for each of the resulting games
         PowerAssignFormset = formset_factory(PowerAssignForm,
                                              formset=BasePowerAssignFormset,
@@ -463,7 +490,13 @@ def create_games(request, tournament_id, round_num):
     t = get_modifiable_tournament_or_404(tournament_id, request.user)
     r = get_round_or_404(t, round_num)
     # Do any games already exist for the round ?
-    games = r.game_set.all()
+    games = r.game_set.select_related('the_set')
+    games = games.prefetch_related(Prefetch('gameplayer_set',
+                                            queryset=GamePlayer.objects.select_related('power')))
+    # Grab all the RoundPlayers for this round in one go, keyed by player
+    rps = {}
+    for rp in r.roundplayer_set.all():
+        rps[rp.player_id] = rp
     data = []
     for g in games:
         current = {'game_id': g.id,
@@ -471,7 +504,7 @@ def create_games(request, tournament_id, round_num):
                    'the_set': g.the_set,
                    'notes': g.notes}
         for gp in g.gameplayer_set.all():
-            current[gp.power.name] = gp.roundplayer()
+            current[gp.power.name] = rps[gp.player_id]
         data.append(current)
     # Estimate the number of games for the round
     round_players = r.roundplayer_set.count()
@@ -486,41 +519,46 @@ def create_games(request, tournament_id, round_num):
                                  the_round=r,
                                  initial=data)
     if formset.is_valid():
-        for f in formset:
-            try:
-                if f.cleaned_data['game_id'] is not None:
-                    # Game should exist
-                    g = Game.objects.get(pk=f.cleaned_data['game_id'])
-                    g.name = f.cleaned_data['name']
-                    g.the_set = f.cleaned_data['the_set']
-                    g.notes = f.cleaned_data['notes']
-                else:
-                    g = Game(name=f.cleaned_data['name'],
-                             the_round=r,
-                             the_set=f.cleaned_data['the_set'],
-                             notes=f.cleaned_data['notes'])
-            except KeyError:
-                # This must be an extra, unused formset
-                continue
-            try:
-                g.full_clean()
-            except ValidationError as e:
-                f.add_error(None, e)
-                return render(request,
-                              'rounds/create_games.html',
-                              {'tournament': t,
-                               'round': r,
-                               'formset': formset})
-            g.save()
-            # Assign the players to the game
-            for power, field in f.cleaned_data.items():
-                try:
-                    p = GreatPower.objects.get(name=power)
-                except GreatPower.DoesNotExist:
-                    continue
-                GamePlayer.objects.update_or_create(game=g,
-                                                    power=p,
-                                                    defaults={'player': field.player})
+        powers_by_name = {p.name: p for p in get_all_powers()}
+        try:
+            with transaction.atomic():
+                for f in formset:
+                    try:
+                        if f.cleaned_data['game_id'] is not None:
+                            # Game should exist
+                            g = Game.objects.get(pk=f.cleaned_data['game_id'])
+                            g.name = f.cleaned_data['name']
+                            g.the_set = f.cleaned_data['the_set']
+                            g.notes = f.cleaned_data['notes']
+                        else:
+                            g = Game(name=f.cleaned_data['name'],
+                                     the_round=r,
+                                     the_set=f.cleaned_data['the_set'],
+                                     notes=f.cleaned_data['notes'])
+                    except KeyError:
+                        # This must be an extra, unused formset
+                        continue
+                    try:
+                        g.full_clean()
+                    except ValidationError as e:
+                        f.add_error(None, e)
+                        # Roll back any games already saved
+                        raise e
+                    g.save()
+                    # Assign the players to the game
+                    for power, field in f.cleaned_data.items():
+                        p = powers_by_name.get(power)
+                        if p is None:
+                            continue
+                        GamePlayer.objects.update_or_create(game=g,
+                                                            power=p,
+                                                            defaults={'player': field.player})
+        except ValidationError:
+            return render(request,
+                          'rounds/create_games.html',
+                          {'tournament': t,
+                           'round': r,
+                           'formset': formset})
         # Notify the players
         send_board_call(r)
         # Redirect to the board call page
@@ -543,7 +581,8 @@ def game_scores(request, tournament_id, round_num):
                                        extra=0)
     # Initial data
     data = []
-    the_list = r.game_set.all()
+    the_list = r.game_set.prefetch_related(Prefetch('gameplayer_set',
+                                                    queryset=GamePlayer.objects.select_related('power')))
     for game in the_list:
         content = {'name': game.name}
         for gp in game.gameplayer_set.all():
@@ -551,23 +590,35 @@ def game_scores(request, tournament_id, round_num):
         data.append(content)
     formset = GameScoreFormset(request.POST or None, initial=data)
     if formset.is_valid():
+        games_by_name = {}
+        for g in r.game_set.all():
+            games_by_name[g.name] = g
+        powers_by_name = {}
+        for p in get_all_powers():
+            powers_by_name[p.name] = p
+        # All the GamePlayers in the round, grouped by (game, power)
+        gps = {}
+        for gp in GamePlayer.objects.filter(game__the_round=r):
+            gps.setdefault((gp.game_id, gp.power_id), []).append(gp)
+        changed = []
         for f in formset:
             # Find the game
-            g = Game.objects.get(name=f.cleaned_data['name'],
-                                 the_round=r)
+            g = games_by_name[f.cleaned_data['name']]
             # Set the score for each player
             for power, field in f.cleaned_data.items():
                 # Ignore non-GreatPower fields (name)
-                try:
-                    p = GreatPower.objects.get(name=power)
-                except GreatPower.DoesNotExist:
+                p = powers_by_name.get(power)
+                if p is None:
                     continue
-                # Find the matching GamePlayer
-                GamePlayer.objects.filter(game=g,
-                                          power=p).update(score=field)
-        # Update the Round and Tournament scores to reflect the changes
-        r.store_scores()
-        t.store_scores()
+                # Find the matching GamePlayer(s)
+                for gp in gps.get((g.id, p.id), []):
+                    gp.score = field
+                    changed.append(gp)
+        with transaction.atomic():
+            GamePlayer.objects.bulk_update(changed, ['score'])
+            # Update the Round and Tournament scores to reflect the changes
+            r.store_scores()
+            t.store_scores()
         # Redirect to the round index
         return HttpResponseRedirect(reverse('round_index',
                                             args=(tournament_id,)))
@@ -583,6 +634,6 @@ def game_index(request, tournament_id, round_num):
     """Display a list of games in the round"""
     t = get_visible_tournament_or_404(tournament_id, request.user)
     r = get_round_or_404(t, round_num)
-    the_list = r.game_set.all()
+    the_list = r.game_set.only('name', 'is_finished', 'the_round')
     context = {'round': r, 'game_list': the_list}
     return render(request, 'games/index.html', context)
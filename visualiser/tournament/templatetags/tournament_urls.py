@@ -0,0 +1,33 @@
+# Diplomacy Tournament Visualiser
+# Copyright (C) 2022 Chris Brand
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Template tags for DipVis URLs.
+"""
+
+from django import template
+
+from tournament.reverse_cached import reverse_cached
+
+register = template.Library()
+
+
+@register.simple_tag
+def curl(viewname, *args, **kwargs):
+    """
+    Drop-in replacement for {% url %} that caches the reversed URL.
+    """
+    return reverse_cached(viewname, args, kwargs)
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
@@ -21,6 +22,8 @@ from tournament.diplomacy import validate_year, validate_year_including_start
 from tournament.diplomacy import validate_ranking
 from tournament.diplomacy import GreatPower, GameSet, SetPower, SupplyCentre
 from tournament.diplomacy import TOTAL_SCS, WINNING_SCS
+from tournament.diplomacy import get_all_powers, get_all_scs
+from tournament.diplomacy import get_power_names, get_sc_names
 
 class DiplomacyTests(TestCase):
     fixtures = ['game_sets.json', 'players.json']
@@ -111,3 +114,40 @@ class DiplomacyTests(TestCase):
     def test_supplycentre_str(self):
         for sc in SupplyCentre.objects.all():
             self.assertEqual(sc.name, str(sc))
+
+    # get_all_powers()
+    def test_get_all_powers(self):
+        self.assertEqual(get_all_powers(), list(GreatPower.objects.all()))
+
+    def test_get_all_powers_changed(self):
+        self.addCleanup(cache.clear)
+        get_all_powers()
+        gp = GreatPower.objects.get(abbreviation='A')
+        gp.name = 'Austro-Hungary'
+        gp.save()
+        self.assertIn('Austro-Hungary', [p.name for p in get_all_powers()])
+
+    # get_all_scs()
+    def test_get_all_scs(self):
+        self.assertEqual(get_all_scs(), list(SupplyCentre.objects.all()))
+        # Second time round, they should come from the cache
+        with self.assertNumQueries(0):
+            get_all_scs()
+
+    # get_power_names()
+    def test_get_power_names(self):
+        self.assertEqual(get_power_names(),
+                         tuple(GreatPower.objects.values_list('name', flat=True)))
+
+    def test_get_power_names_changed(self):
+        self.addCleanup(cache.clear)
+        get_power_names()
+        gp = GreatPower.objects.get(abbreviation='A')
+        gp.name = 'Austro-Hungary'
+        gp.save()
+        self.assertIn('Austro-Hungary', get_power_names())
+
+    # get_sc_names()
+    def test_get_sc_names(self):
+        self.assertEqual(get_sc_names(),
+                         tuple(SupplyCentre.objects.values_list('name', flat=True)))
@@ -19,6 +19,7 @@ Forms Tests for the Diplomacy Tournament Visualiser.
 """
 from datetime import timedelta
 
+from django.core.cache import cache
 from django.forms.formsets import formset_factory
 from django.test import TestCase
 from django.utils import timezone
@@ -121,6 +122,14 @@ class PrefsFormsetTest(TestCase):
         self.assertIn(self.tp1, tps)
         self.assertIn(self.tp2, tps)
 
+    def test_prefs_formset_queries(self):
+        # TournamentPlayers (with Players) and Preferences,
+        # regardless of how many TournamentPlayers there are
+        with self.assertNumQueries(2):
+            formset = self.PrefsFormset(tournament=self.t)
+            for form in formset:
+                form.as_p()
+
     def test_prefs_formset_initial(self):
         initial = []
         initial.append({'prefs': 'EF'})
@@ -215,6 +224,24 @@ class GameScoreFormTest(TestCase):
             with self.subTest(power=power.name):
                 self.assertFalse(form.fields[power.name].required)
 
+    def test_power_fields_not_shared(self):
+        form1 = GameScoreForm()
+        form2 = GameScoreForm()
+        for power in GreatPower.objects.all():
+            with self.subTest(power=power.name):
+                self.assertIn(power.name, GameScoreForm.base_fields)
+                self.assertIsNot(form1.fields[power.name], form2.fields[power.name])
+
+    def test_power_fields_renamed(self):
+        self.addCleanup(cache.clear)
+        GameScoreForm()
+        power = GreatPower.objects.get(abbreviation='E')
+        power.name = 'Britain'
+        power.save()
+        form = GameScoreForm()
+        self.assertIn('Britain', form.fields)
+        self.assertNotIn('England', form.fields)
+
 
 class GamePlayersFormTest(TestCase):
     fixtures = ['game_sets.json']
@@ -309,6 +336,12 @@ class GamePlayersFormTest(TestCase):
         self.assertEqual(the_choices[7][1], self.rp7.player.sortable_str())
         self.assertEqual(the_choices[8][1], self.rp8.player.sortable_str())
 
+    def test_power_choices_queries(self):
+        form = GamePlayersForm(the_round=self.r1)
+        # The Players should be read along with the RoundPlayers
+        with self.assertNumQueries(1):
+            list(iter(form.fields['England'].choices))
+
     def test_success(self):
         data = {'name': 'R1G1',
                 'the_set': str(GameSet.objects.first().pk),
@@ -1742,6 +1775,12 @@ class BasePlayerRoundFormsetTest(TestCase):
                     # There should be checkboxes for present and standby
                     self.assertIn(field, ['present', 'standby'])
 
+    def test_player_choices_read_once(self):
+        formset = self.PlayerRoundFormset(self.data, tournament=self.t1, round_num=1)
+        # One query for all the Players, however many forms there are
+        with self.assertNumQueries(1):
+            formset.as_p()
+
     def test_no_players(self):
         # Should be fine for a Tournament with no TournamentPlayers
         formset = self.PlayerRoundFormset(self.data, tournament=self.t2, round_num=1)
@@ -37,6 +37,7 @@ from tournament.models import InvalidPreferenceList
 from tournament.players import Player, MASK_ALL_BG
 
 from datetime import timedelta
+from functools import lru_cache
 
 HOURS_8 = timedelta(hours=8)
 HOURS_9 = timedelta(hours=9)
@@ -45,6 +46,18 @@ HOURS_16 = timedelta(hours=16)
 HOURS_24 = timedelta(hours=24)
 
 
+# The GreatPowers and SupplyCentres come from the game_sets fixture,
+# with fixed primary keys, so they can be shared by all the tests
+@lru_cache(maxsize=1)
+def _all_powers():
+    return tuple(GreatPower.objects.all())
+
+
+@lru_cache(maxsize=1)
+def _scs_by_abbreviation():
+    return SupplyCentre.objects.in_bulk(field_name='abbreviation')
+
+
 @override_settings(HOSTNAME='example.com')
 class TournamentModelTests(TestCase):
     fixtures = ['game_sets.json', 'players.json']
@@ -96,10 +109,20 @@ class TournamentModelTests(TestCase):
                                    scoring_system=s1,
                                    dias=True,
                                    start=t1.start_date + HOURS_16)
-        Round.objects.create(tournament=t1,
-                             scoring_system=s1,
-                             dias=True,
-                             start=t1.start_date + HOURS_24)
+        r14 = Round.objects.create(tournament=t1,
+                                   scoring_system=s1,
+                                   dias=True,
+                                   start=t1.start_date + HOURS_24)
+
+        # Easy access to the Tournaments and t1's Rounds
+        cls.t1 = t1
+        cls.t2 = t2
+        cls.t3 = t3
+        cls.r11 = r11
+        cls.r12 = r12
+        cls.r13 = r13
+        cls.r14 = r14
+
         # Add Rounds to t2
         r21 = Round.objects.create(tournament=t2,
                                    scoring_system=s1,
@@ -185,31 +208,33 @@ class TournamentModelTests(TestCase):
         cls.turkey = GreatPower.objects.get(abbreviation='T')
 
         # Add CentreCounts to g11
-        CentreCount.objects.create(power=cls.austria, game=g11, year=1901, count=5)
-        CentreCount.objects.create(power=cls.england, game=g11, year=1901, count=4)
-        CentreCount.objects.create(power=cls.france, game=g11, year=1901, count=5)
-        CentreCount.objects.create(power=cls.germany, game=g11, year=1901, count=5)
-        CentreCount.objects.create(power=cls.italy, game=g11, year=1901, count=4)
-        CentreCount.objects.create(power=cls.russia, game=g11, year=1901, count=5)
-        CentreCount.objects.create(power=cls.turkey, game=g11, year=1901, count=4)
-
-        # Eliminate Italy in 1903
-        CentreCount.objects.create(power=cls.austria, game=g11, year=1903, count=5)
-        CentreCount.objects.create(power=cls.england, game=g11, year=1903, count=5)
-        CentreCount.objects.create(power=cls.france, game=g11, year=1903, count=5)
-        CentreCount.objects.create(power=cls.germany, game=g11, year=1903, count=10)
-        CentreCount.objects.create(power=cls.italy, game=g11, year=1903, count=0)
-        CentreCount.objects.create(power=cls.russia, game=g11, year=1903, count=5)
-        CentreCount.objects.create(power=cls.turkey, game=g11, year=1903, count=4)
-
-        # Solo victory for Germany in 1904
-        CentreCount.objects.create(power=cls.austria, game=g11, year=1904, count=0)
-        CentreCount.objects.create(power=cls.england, game=g11, year=1904, count=4)
-        CentreCount.objects.create(power=cls.france, game=g11, year=1904, count=4)
-        CentreCount.objects.create(power=cls.germany, game=g11, year=1904, count=18)
-        CentreCount.objects.create(power=cls.italy, game=g11, year=1904, count=0)
-        CentreCount.objects.create(power=cls.russia, game=g11, year=1904, count=3)
-        CentreCount.objects.create(power=cls.turkey, game=g11, year=1904, count=5)
+        CentreCount.objects.bulk_create([
+            CentreCount(power=cls.austria, game=g11, year=1901, count=5),
+            CentreCount(power=cls.england, game=g11, year=1901, count=4),
+            CentreCount(power=cls.france, game=g11, year=1901, count=5),
+            CentreCount(power=cls.germany, game=g11, year=1901, count=5),
+            CentreCount(power=cls.italy, game=g11, year=1901, count=4),
+            CentreCount(power=cls.russia, game=g11, year=1901, count=5),
+            CentreCount(power=cls.turkey, game=g11, year=1901, count=4),
+
+            # Eliminate Italy in 1903
+            CentreCount(power=cls.austria, game=g11, year=1903, count=5),
+            CentreCount(power=cls.england, game=g11, year=1903, count=5),
+            CentreCount(power=cls.france, game=g11, year=1903, count=5),
+            CentreCount(power=cls.germany, game=g11, year=1903, count=10),
+            CentreCount(power=cls.italy, game=g11, year=1903, count=0),
+            CentreCount(power=cls.russia, game=g11, year=1903, count=5),
+            CentreCount(power=cls.turkey, game=g11, year=1903, count=4),
+
+            # Solo victory for Germany in 1904
+            CentreCount(power=cls.austria, game=g11, year=1904, count=0),
+            CentreCount(power=cls.england, game=g11, year=1904, count=4),
+            CentreCount(power=cls.france, game=g11, year=1904, count=4),
+            CentreCount(power=cls.germany, game=g11, year=1904, count=18),
+            CentreCount(power=cls.italy, game=g11, year=1904, count=0),
+            CentreCount(power=cls.russia, game=g11, year=1904, count=3),
+            CentreCount(power=cls.turkey, game=g11, year=1904, count=5),
+        ])
 
         # Create some players
         # Avoid hitting the WDD by not providing a WDD id
@@ -233,58 +258,58 @@ class TournamentModelTests(TestCase):
         # which will need a player for every country
         # TODO These should really error out with no corresponding RoundPlayer. I guess clean() is not called ?
         # Add GamePlayers to g11
-        GamePlayer.objects.create(player=cls.p1,
-                                  game=g11,
-                                  power=cls.austria)
-        GamePlayer.objects.create(player=cls.p3, game=g11, power=cls.england)
-        GamePlayer.objects.create(player=cls.p4, game=g11, power=cls.france)
-        GamePlayer.objects.create(player=cls.p5, game=g11, power=cls.germany)
-        GamePlayer.objects.create(player=cls.p6, game=g11, power=cls.italy)
-        GamePlayer.objects.create(player=cls.p7, game=g11, power=cls.russia)
-        GamePlayer.objects.create(player=cls.p8, game=g11, power=cls.turkey)
-        # Add GamePlayers to g12
-        GamePlayer.objects.create(player=cls.p7, game=g12, power=cls.austria)
-        GamePlayer.objects.create(player=cls.p6, game=g12, power=cls.england)
-        GamePlayer.objects.create(player=cls.p5, game=g12, power=cls.france)
-        GamePlayer.objects.create(player=cls.p4, game=g12, power=cls.germany)
-        GamePlayer.objects.create(player=cls.p3, game=g12, power=cls.italy)
-        GamePlayer.objects.create(player=cls.p2, game=g12, power=cls.russia)
-        GamePlayer.objects.create(player=cls.p1, game=g12, power=cls.turkey)
-        # Add GamePlayers to g13
-        GamePlayer.objects.create(player=cls.p1,
-                                  game=g13,
-                                  power=cls.austria)
-        GamePlayer.objects.create(player=cls.p3, game=g13, power=cls.england)
-        GamePlayer.objects.create(player=cls.p4, game=g13, power=cls.france)
-        GamePlayer.objects.create(player=cls.p5, game=g13, power=cls.germany)
-        GamePlayer.objects.create(player=cls.p6, game=g13, power=cls.italy)
-        GamePlayer.objects.create(player=cls.p7, game=g13, power=cls.russia)
-        GamePlayer.objects.create(player=cls.p8, game=g13, power=cls.turkey)
-        # Add GamePlayers to g14
-        GamePlayer.objects.create(player=cls.p7, game=g14, power=cls.austria)
-        GamePlayer.objects.create(player=cls.p6, game=g14, power=cls.england)
-        GamePlayer.objects.create(player=cls.p5, game=g14, power=cls.france)
-        GamePlayer.objects.create(player=cls.p4, game=g14, power=cls.germany)
-        GamePlayer.objects.create(player=cls.p3, game=g14, power=cls.italy)
-        GamePlayer.objects.create(player=cls.p2, game=g14, power=cls.russia)
-        GamePlayer.objects.create(player=cls.p1, game=g14, power=cls.turkey)
+        GamePlayer.objects.bulk_create([
+            GamePlayer(player=cls.p1, game=g11, power=cls.austria),
+            GamePlayer(player=cls.p3, game=g11, power=cls.england),
+            GamePlayer(player=cls.p4, game=g11, power=cls.france),
+            GamePlayer(player=cls.p5, game=g11, power=cls.germany),
+            GamePlayer(player=cls.p6, game=g11, power=cls.italy),
+            GamePlayer(player=cls.p7, game=g11, power=cls.russia),
+            GamePlayer(player=cls.p8, game=g11, power=cls.turkey),
+            # Add GamePlayers to g12
+            GamePlayer(player=cls.p7, game=g12, power=cls.austria),
+            GamePlayer(player=cls.p6, game=g12, power=cls.england),
+            GamePlayer(player=cls.p5, game=g12, power=cls.france),
+            GamePlayer(player=cls.p4, game=g12, power=cls.germany),
+            GamePlayer(player=cls.p3, game=g12, power=cls.italy),
+            GamePlayer(player=cls.p2, game=g12, power=cls.russia),
+            GamePlayer(player=cls.p1, game=g12, power=cls.turkey),
+            # Add GamePlayers to g13
+            GamePlayer(player=cls.p1, game=g13, power=cls.austria),
+            GamePlayer(player=cls.p3, game=g13, power=cls.england),
+            GamePlayer(player=cls.p4, game=g13, power=cls.france),
+            GamePlayer(player=cls.p5, game=g13, power=cls.germany),
+            GamePlayer(player=cls.p6, game=g13, power=cls.italy),
+            GamePlayer(player=cls.p7, game=g13, power=cls.russia),
+            GamePlayer(player=cls.p8, game=g13, power=cls.turkey),
+            # Add GamePlayers to g14
+            GamePlayer(player=cls.p7, game=g14, power=cls.austria),
+            GamePlayer(player=cls.p6, game=g14, power=cls.england),
+            GamePlayer(player=cls.p5, game=g14, power=cls.france),
+            GamePlayer(player=cls.p4, game=g14, power=cls.germany),
+            GamePlayer(player=cls.p3, game=g14, power=cls.italy),
+            GamePlayer(player=cls.p2, game=g14, power=cls.russia),
+            GamePlayer(player=cls.p1, game=g14, power=cls.turkey),
+        ])
         # And the corresponding RoundPlayers
-        RoundPlayer.objects.create(player=cls.p1, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p2, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p3, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p4, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p5, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p6, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p7, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p8, the_round=r11)
-        RoundPlayer.objects.create(player=cls.p1, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p2, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p3, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p4, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p5, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p6, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p7, the_round=r12)
-        RoundPlayer.objects.create(player=cls.p8, the_round=r12)
+        RoundPlayer.objects.bulk_create([
+            RoundPlayer(player=cls.p1, the_round=r11),
+            RoundPlayer(player=cls.p2, the_round=r11),
+            RoundPlayer(player=cls.p3, the_round=r11),
+            RoundPlayer(player=cls.p4, the_round=r11),
+            RoundPlayer(player=cls.p5, the_round=r11),
+            RoundPlayer(player=cls.p6, the_round=r11),
+            RoundPlayer(player=cls.p7, the_round=r11),
+            RoundPlayer(player=cls.p8, the_round=r11),
+            RoundPlayer(player=cls.p1, the_round=r12),
+            RoundPlayer(player=cls.p2, the_round=r12),
+            RoundPlayer(player=cls.p3, the_round=r12),
+            RoundPlayer(player=cls.p4, the_round=r12),
+            RoundPlayer(player=cls.p5, the_round=r12),
+            RoundPlayer(player=cls.p6, the_round=r12),
+            RoundPlayer(player=cls.p7, the_round=r12),
+            RoundPlayer(player=cls.p8, the_round=r12),
+        ])
         # And TournamentPlayers
         TournamentPlayer.objects.create(player=cls.p1, tournament=t1)
         TournamentPlayer.objects.create(player=cls.p2, tournament=t1)
@@ -1002,7 +1027,7 @@ class TournamentModelTests(TestCase):
         CentreCount.objects.create(power=self.turkey, game=g14, year=1905, count=5)
         # Check best countries with criterion of score
         bc = t.best_countries(True)
-        for power in GreatPower.objects.all():
+        for power in _all_powers():
             with self.subTest(criterion=Tournament.SCORE, power=power):
                 gp1 = g12.gameplayer_set.get(power=power)
                 gp2 = g14.gameplayer_set.get(power=power)
@@ -1015,7 +1040,7 @@ class TournamentModelTests(TestCase):
         t.save()
         # Now best countries should be different
         bc = t.best_countries(True)
-        for power in GreatPower.objects.all():
+        for power in _all_powers():
             with self.subTest(criterion=Tournament.DOTS, power=power):
                 gp1 = g12.gameplayer_set.get(power=power)
                 gp2 = g14.gameplayer_set.get(power=power)
@@ -1081,16 +1106,13 @@ class TournamentModelTests(TestCase):
 
     # Tournament.is_finished()
     def test_tourney_is_finished_some_rounds_over(self):
-        t = Tournament.objects.get(name='t1')
-        self.assertFalse(t.is_finished())
+        self.assertFalse(self.t1.is_finished())
 
     def test_tourney_is_finished_no_rounds_over(self):
-        t = Tournament.objects.get(name='t2')
-        self.assertFalse(t.is_finished())
+        self.assertFalse(self.t2.is_finished())
 
     def test_tourney_is_finished_all_rounds_over(self):
-        t = Tournament.objects.get(name='t3')
-        self.assertTrue(t.is_finished())
+        self.assertTrue(self.t3.is_finished())
 
     def test_tourney_is_finished_no_rounds(self):
         t = Tournament.objects.create(name='Roundless',
@@ -1545,63 +1567,45 @@ class TournamentModelTests(TestCase):
 
     # Round.is_finished()
     def test_round_is_finished_no_games_over(self):
-        t = Tournament.objects.get(name='t1')
-        r1 = t.round_numbered(1)
-        self.assertFalse(r1.is_finished())
+        self.assertFalse(self.r11.is_finished())
 
     def test_round_is_finished_some_games_over(self):
-        t = Tournament.objects.get(name='t1')
-        r2 = t.round_numbered(2)
-        self.assertFalse(r2.is_finished())
+        self.assertFalse(self.r12.is_finished())
 
     def test_round_is_finished_all_games_over(self):
-        t = Tournament.objects.get(name='t1')
-        r3 = t.round_numbered(3)
-        self.assertTrue(r3.is_finished())
+        self.assertTrue(self.r13.is_finished())
 
     def test_round_is_finished_no_games(self):
         """
         Rounds with no games can't have started, let alone finished
         """
-        t = Tournament.objects.get(name='t1')
-        r4 = t.round_numbered(4)
-        self.assertFalse(r4.is_finished())
+        self.assertFalse(self.r14.is_finished())
 
     # Round.in_progress()
     def test_round_in_progress_no_games_over(self):
-        t = Tournament.objects.get(name='t1')
-        r1 = t.round_numbered(1)
-        self.assertTrue(r1.in_progress())
+        self.assertTrue(self.r11.in_progress())
 
     def test_round_in_progress_some_games_over(self):
-        t = Tournament.objects.get(name='t1')
-        r2 = t.round_numbered(2)
-        self.assertTrue(r2.in_progress())
+        self.assertTrue(self.r12.in_progress())
 
     def test_round_in_progress_all_games_over(self):
-        t = Tournament.objects.get(name='t1')
-        r3 = t.round_numbered(3)
-        self.assertFalse(r3.in_progress())
+        self.assertFalse(self.r13.in_progress())
 
     def test_round_in_progress_no_games(self):
         """
         Rounds with round players but no games are just starting,
         and so are deemed to be "in progress".
         """
-        t = Tournament.objects.get(name='t1')
-        r4 = t.round_numbered(4)
-        rp = RoundPlayer(player=self.p9, the_round=r4)
+        rp = RoundPlayer(player=self.p9, the_round=self.r14)
         rp.save()
-        self.assertTrue(r4.in_progress())
+        self.assertTrue(self.r14.in_progress())
         rp.delete()
 
     def test_round_in_progress_no_round_players(self):
         """
         Rounds with no round players haven't started
         """
-        t = Tournament.objects.get(name='t1')
-        r4 = t.round_numbered(4)
-        self.assertFalse(r4.in_progress())
+        self.assertFalse(self.r14.in_progress())
 
     # Round.number()
     def test_round_number_11(self):
@@ -1851,16 +1855,16 @@ class TournamentModelTests(TestCase):
 
     def test_create_sc_count(self):
         test_data = {
-                        SupplyCentre.objects.get(abbreviation='Sev'): self.austria,
-                        SupplyCentre.objects.get(abbreviation='Mos'): self.austria,
-                        SupplyCentre.objects.get(abbreviation='Edi'): self.france,
-                        SupplyCentre.objects.get(abbreviation='Par'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Mun'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Tun'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Spa'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Por'): self.italy,
-                        SupplyCentre.objects.get(abbreviation='Bud'): self.italy,
-                        SupplyCentre.objects.get(abbreviation='Bul'): self.austria,
+                        _scs_by_abbreviation()['Sev']: self.austria,
+                        _scs_by_abbreviation()['Mos']: self.austria,
+                        _scs_by_abbreviation()['Edi']: self.france,
+                        _scs_by_abbreviation()['Par']: self.germany,
+                        _scs_by_abbreviation()['Mun']: self.germany,
+                        _scs_by_abbreviation()['Tun']: self.germany,
+                        _scs_by_abbreviation()['Spa']: self.germany,
+                        _scs_by_abbreviation()['Por']: self.italy,
+                        _scs_by_abbreviation()['Bud']: self.italy,
+                        _scs_by_abbreviation()['Bul']: self.austria,
                     }
         # expected results
         res = {
@@ -1901,16 +1905,16 @@ class TournamentModelTests(TestCase):
     # Game.compare_sc_counts_and_ownerships()
     def test_game_compare_sc_counts_and_ownerships(self):
         test_data = {
-                        SupplyCentre.objects.get(abbreviation='Sev'): self.austria,
-                        SupplyCentre.objects.get(abbreviation='Mos'): self.austria,
-                        SupplyCentre.objects.get(abbreviation='Edi'): self.france,
-                        SupplyCentre.objects.get(abbreviation='Par'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Mun'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Tun'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Spa'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Por'): self.italy,
-                        SupplyCentre.objects.get(abbreviation='Bud'): self.italy,
-                        SupplyCentre.objects.get(abbreviation='Bul'): self.austria,
+                        _scs_by_abbreviation()['Sev']: self.austria,
+                        _scs_by_abbreviation()['Mos']: self.austria,
+                        _scs_by_abbreviation()['Edi']: self.france,
+                        _scs_by_abbreviation()['Par']: self.germany,
+                        _scs_by_abbreviation()['Mun']: self.germany,
+                        _scs_by_abbreviation()['Tun']: self.germany,
+                        _scs_by_abbreviation()['Spa']: self.germany,
+                        _scs_by_abbreviation()['Por']: self.italy,
+                        _scs_by_abbreviation()['Bud']: self.italy,
+                        _scs_by_abbreviation()['Bul']: self.austria,
                     }
         # expected results
         res = {
@@ -1956,16 +1960,16 @@ class TournamentModelTests(TestCase):
     # Game.scores
     def test_update_sc_count(self):
         test_data = {
-                        SupplyCentre.objects.get(abbreviation='Sev'): self.austria,
-                        SupplyCentre.objects.get(abbreviation='Mos'): self.austria,
-                        SupplyCentre.objects.get(abbreviation='Edi'): self.france,
-                        SupplyCentre.objects.get(abbreviation='Par'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Mun'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Tun'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Spa'): self.germany,
-                        SupplyCentre.objects.get(abbreviation='Por'): self.italy,
-                        SupplyCentre.objects.get(abbreviation='Bud'): self.italy,
-                        SupplyCentre.objects.get(abbreviation='Bul'): self.austria,
+                        _scs_by_abbreviation()['Sev']: self.austria,
+                        _scs_by_abbreviation()['Mos']: self.austria,
+                        _scs_by_abbreviation()['Edi']: self.france,
+                        _scs_by_abbreviation()['Par']: self.germany,
+                        _scs_by_abbreviation()['Mun']: self.germany,
+                        _scs_by_abbreviation()['Tun']: self.germany,
+                        _scs_by_abbreviation()['Spa']: self.germany,
+                        _scs_by_abbreviation()['Por']: self.italy,
+                        _scs_by_abbreviation()['Bud']: self.italy,
+                        _scs_by_abbreviation()['Bul']: self.austria,
                     }
         # expected results
         res = {
@@ -2581,7 +2585,7 @@ class TournamentModelTests(TestCase):
     # SupplyCentreOwnership.__str__()
     def test_supplycentreownership_str(self):
         g = Game.objects.first()
-        sc = SupplyCentre.objects.get(abbreviation='Mun')
+        sc = _scs_by_abbreviation()['Mun']
         sco = SupplyCentreOwnership.objects.create(sc=sc, owner=self.austria, year=1909, game=g)
         # TODO validate result
         str(sco)
@@ -0,0 +1,46 @@
+# Diplomacy Tournament Visualiser
+# Copyright (C) 2022 Chris Brand
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.template import Context, Template
+from django.test import SimpleTestCase
+from django.urls import NoReverseMatch, reverse
+
+from tournament.reverse_cached import reverse_cached
+
+class ReverseCachedTests(SimpleTestCase):
+
+    # reverse_cached()
+    def test_reverse_cached_args(self):
+        self.assertEqual(reverse_cached('game_detail', args=[1, 'R1G1']),
+                         reverse('game_detail', args=[1, 'R1G1']))
+
+    def test_reverse_cached_kwargs(self):
+        kwargs = {'tournament_id': 1, 'game_name': 'R1G1'}
+        self.assertEqual(reverse_cached('game_detail', kwargs=kwargs),
+                         reverse('game_detail', kwargs=kwargs))
+
+    def test_reverse_cached_repeat(self):
+        url = reverse_cached('tournament_detail', args=[2])
+        self.assertEqual(reverse_cached('tournament_detail', args=[2]), url)
+
+    def test_reverse_cached_no_match(self):
+        self.assertRaises(NoReverseMatch, reverse_cached, 'tournament_detail', args=['x'])
+
+    # {% curl %}
+    def test_curl_tag(self):
+        t = Template("{% load tournament_urls %}{% curl 'game_sc_chart' 1 'R1G1' %}")
+        self.assertEqual(t.render(Context()),
+                         reverse('game_sc_chart', args=[1, 'R1G1']))
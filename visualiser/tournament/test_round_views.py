@@ -18,6 +18,7 @@ from datetime import timedelta
 from urllib.parse import urlencode
 
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
@@ -333,6 +334,10 @@ class RoundViewTests(TestCase):
         GamePlayer.objects.create(player=cls.p8, game=g2, power=cls.england, score=6)
         GamePlayer.objects.create(player=cls.p9, game=g2, power=cls.austria, score=7)
 
+    def setUp(self):
+        # Don't serve pages cached by earlier tests
+        caches['pages'].clear()
+
     def test_detail(self):
         response = self.client.get(reverse('round_detail', args=(self.t1.pk, 1)))
         self.assertEqual(response.status_code, 200)
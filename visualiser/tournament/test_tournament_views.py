@@ -18,7 +18,10 @@ import uuid
 from urllib.parse import urlencode
 
 from django.contrib.auth.models import Permission, User
-from django.test import TestCase, override_settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
@@ -312,6 +315,10 @@ class TournamentViewTests(TestCase):
         # Hopefully this isn't the pk for any Tournament
         cls.INVALID_T_PK = 99999
 
+    def setUp(self):
+        # Don't serve pages cached by earlier tests
+        caches['pages'].clear()
+
     def test_index(self):
         response = self.client.get(reverse('index'))
         self.assertEqual(response.status_code, 200)
@@ -435,6 +442,8 @@ class TournamentViewTests(TestCase):
         response = self.client.get(reverse('tournament_scores', args=(self.t4.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Final Scores', response.content)
+        # Round score for the sitter is flagged
+        self.assertIn(b'0.00*', response.content)
         rp.delete()
         tp.delete()
 
@@ -443,6 +452,21 @@ class TournamentViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'<meta http-equiv="refresh"', response.content)
 
+    def test_cached_pages_unpublished(self):
+        # A manager's view of an unpublished tournament mustn't be served to anyone else
+        self.addCleanup(caches['pages'].clear)
+        for name in ['tournament_scores', 'round_index', 'tournament_news']:
+            with self.subTest(view=name):
+                url = reverse(name, args=(self.t2.pk,))
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.client.login(username=self.USERNAME3, password=self.PWORD3)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.client.logout()
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+
     def test_game_results(self):
         response = self.client.get(reverse('tournament_game_results', args=(self.t4.pk,)))
         self.assertEqual(response.status_code, 200)
@@ -614,10 +638,51 @@ class TournamentViewTests(TestCase):
         response = self.client.get(reverse('upload_prefs', args=(self.t1.pk,)))
         self.assertEqual(response.status_code, 302)
 
+    def test_upload_prefs(self):
+        self.client.login(username=self.USERNAME3, password=self.PWORD3)
+        tp = self.t2.tournamentplayer_set.first()
+        self.assertFalse(tp.preference_set.exists())
+        content = 'Id,First Name,Last Name,Preferences\r\n'
+        content += '%d,%s,%s,FRT\r\n' % (tp.pk, tp.player.first_name, tp.player.last_name)
+        csv_file = SimpleUploadedFile('prefs.csv',
+                                      content.encode('utf8'),
+                                      content_type='text/csv')
+        response = self.client.post(reverse('upload_prefs', args=(self.t2.pk,)),
+                                    {'csv_file': csv_file})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('enter_prefs', args=(self.t2.pk,)))
+        self.assertEqual(tp.prefs_string(), 'FRT')
+        # Clean up
+        tp.preference_set.all().delete()
+
+    def test_upload_prefs_invalid(self):
+        # A bad row means none of the file is used
+        self.client.login(username=self.USERNAME3, password=self.PWORD3)
+        tp = self.t2.tournamentplayer_set.first()
+        self.assertFalse(tp.preference_set.exists())
+        content = 'Id,First Name,Last Name,Preferences\r\n'
+        content += '%d,%s,%s,FRT\r\n' % (tp.pk, tp.player.first_name, tp.player.last_name)
+        content += '%d,%s,%s,FRT\r\n' % (tp.pk, 'Wrong', tp.player.last_name)
+        csv_file = SimpleUploadedFile('prefs.csv',
+                                      content.encode('utf8'),
+                                      content_type='text/csv')
+        response = self.client.post(reverse('upload_prefs', args=(self.t2.pk,)),
+                                    {'csv_file': csv_file})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('upload_prefs', args=(self.t2.pk,)))
+        self.assertFalse(tp.preference_set.exists())
+
     def test_prefs_csv(self):
         response = self.client.get(reverse('prefs_csv', args=(self.t1.pk,)))
         self.assertEqual(response.status_code, 200)
 
+    def test_prefs_csv_content(self):
+        response = self.client.get(reverse('prefs_csv', args=(self.t1.pk,)))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Id,First Name,Last Name,Preferences')
+        # One row per TournamentPlayer
+        self.assertEqual(len(lines), 1 + self.t1.tournamentplayer_set.count())
+
     def test_seeder_bias_not_logged_in(self):
         response = self.client.get(reverse('seeder_bias', args=(self.t1.pk,)))
         self.assertEqual(response.status_code, 302)
@@ -698,3 +763,62 @@ class TournamentViewTests(TestCase):
                                     data,
                                     content_type='application/x-www-form-urlencoded')
         self.assertEqual(response.status_code, 404)
+
+
+class PageCacheTests(TransactionTestCase):
+    """
+    The cache is only cleared once changes are committed,
+    so these tests need real transactions.
+    """
+    def setUp(self):
+        now = timezone.now()
+        self.t = Tournament.objects.create(name='t',
+                                           start_date=now,
+                                           end_date=now,
+                                           round_scoring_system=R_SCORING_SYSTEMS[0].name,
+                                           tournament_scoring_system=T_SCORING_SYSTEMS[0].name,
+                                           draw_secrecy=Tournament.SECRET,
+                                           is_published=True)
+        self.addCleanup(caches['pages'].clear)
+
+    def test_scores_cache_cleared(self):
+        # Changing the Tournament discards the cached scores page
+        url = reverse('tournament_scores', args=(self.t.pk,))
+        response = self.client.get(url)
+        self.assertNotIn(b'Renamed', response.content)
+        self.t.name = 'Renamed'
+        self.t.save()
+        response = self.client.get(url)
+        self.assertIn(b'Renamed', response.content)
+
+    def test_scores_cache_cleared_on_commit(self):
+        # The cache isn't cleared until the change is committed
+        url = reverse('tournament_scores', args=(self.t.pk,))
+        self.client.get(url)
+        with transaction.atomic():
+            self.t.name = 'Renamed'
+            self.t.save()
+            response = self.client.get(url)
+            self.assertNotIn(b'Renamed', response.content)
+        response = self.client.get(url)
+        self.assertIn(b'Renamed', response.content)
+
+    def test_bulk_writes_clear_cache(self):
+        # Bulk operations don't send post_save, but still discard cached pages
+        r = Round.objects.create(tournament=self.t,
+                                 start=self.t.start_date,
+                                 scoring_system=G_SCORING_SYSTEMS[0].name,
+                                 dias=True)
+        p = Player.objects.create(first_name='Angela', last_name='Ampersand')
+        cache = caches['pages']
+        cache.set('page', 'content')
+        RoundPlayer.objects.bulk_create([RoundPlayer(player=p, the_round=r)])
+        self.assertIsNone(cache.get('page'))
+        rp = RoundPlayer.objects.get(player=p, the_round=r)
+        rp.score = 1.0
+        cache.set('page', 'content')
+        RoundPlayer.objects.bulk_update([rp], ['score'])
+        self.assertIsNone(cache.get('page'))
+        cache.set('page', 'content')
+        r.roundplayer_set.update(score=2.0)
+        self.assertIsNone(cache.get('page'))
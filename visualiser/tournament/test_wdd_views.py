@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import csv
 from datetime import timedelta
 
 from django.test import TestCase
@@ -399,9 +400,29 @@ class WddViewTests(TestCase):
                                    year=1907,
                                    count=7)
 
+    def _csv_rows(self, response):
+        """Returns the rows of a streamed CSV file, as dicts"""
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.DictReader(content.splitlines()))
+
     def test_classification(self):
         response = self.client.get(reverse('csv_classification', args=(self.t.pk,)))
         self.assertEqual(response.status_code, 200)
+        rows = {row['NAME']: row for row in self._csv_rows(response)}
+        self.assertEqual(len(rows), 14)
+        # Bobby played Italy on the top board
+        row = rows['Bandersnatch']
+        self.assertEqual(row['NAME_TOPBOARD'], 'A')
+        self.assertEqual(row['HEAT_TOPBOARD'], '2')
+        self.assertEqual(row['BOARD_TOPBOARD'], str(Game.objects.get(name='TopBoard').id))
+        self.assertEqual(row['CT_TOPBOARD'], '6')
+        self.assertEqual(row['COUNTRY_TOPBOARD'], '0IT')
+        # Angela didn't play on the top board
+        row = rows['Ampersand']
+        for field in ['NAME_TOPBOARD', 'HEAT_TOPBOARD', 'BOARD_TOPBOARD',
+                      'RK_TOPBOARD', 'CT_TOPBOARD', 'COUNTRY_TOPBOARD']:
+            with self.subTest(field=field):
+                self.assertEqual(row[field], '')
 
     def test_classification_no_top_board(self):
         # Switch the top board to a regular board
@@ -417,4 +438,46 @@ class WddViewTests(TestCase):
     def test_boards(self):
         response = self.client.get(reverse('csv_boards', args=(self.t.pk,)))
         self.assertEqual(response.status_code, 200)
+        rows = {(row['NAME'], row['ROUND']): row for row in self._csv_rows(response)}
+        self.assertEqual(len(rows), 21)
+        # R1G1 ended in a solo by Russia
+        row = rows[('Bandersnatch', '1')]
+        self.assertEqual(row['BOARD'], str(Game.objects.get(name='R1G1').id))
+        self.assertEqual(row['COUNTRY'], '0RU')
+        self.assertEqual(row['NB_CENTRE'], '18')
+        self.assertEqual(row['DRAW'], '1')
+        self.assertEqual(row['CT_03'], '10')
+        self.assertEqual(row['CT_09'], '18')
+        # Austria was eliminated by 1903
+        row = rows[('Maleficent', '1')]
+        self.assertEqual(row['YEAR_ELIMINATION'], '3')
+        self.assertEqual(row['DRAW'], '0')
+        # France survived, and the previous row's elimination year doesn't carry over
+        row = rows[('Grape', '1')]
+        self.assertEqual(row['YEAR_ELIMINATION'], '')
+        self.assertEqual(row['NB_CENTRE'], '4')
+        # R1G2 ended in an England-France draw
+        row = rows[('Dromedary', '1')]
+        self.assertEqual(row['DRAW'], '2')
+        self.assertEqual(row['CT_08'], '8')
+        self.assertEqual(row['CT_10'], '12')
+        # Germany was eliminated in 1910
+        row = rows[('Ignoramus', '1')]
+        self.assertEqual(row['YEAR_ELIMINATION'], '10')
+        self.assertEqual(row['DRAW'], '0')
+        row = rows[('Jalopy', '1')]
+        self.assertEqual(row['YEAR_ELIMINATION'], '')
+        self.assertEqual(row['DRAW'], '0')
+        # The top board ended without a solo or draw,
+        # and only has the 1907 centre counts
+        row = rows[('Lemon', '2')]
+        self.assertEqual(row['BOARD'], str(Game.objects.get(name='TopBoard').id))
+        self.assertEqual(row['DRAW'], '')
+        self.assertEqual(row['YEAR_ELIMINATION'], '')
+        self.assertEqual(row['CT_07'], '7')
+        self.assertEqual(row['CT_08'], '')
+        self.assertEqual(row['CT_10'], '')
+        row = rows[('Notorious', '2')]
+        self.assertEqual(row['YEAR_ELIMINATION'], '7')
+        self.assertEqual(row['NB_CENTRE'], '0')
 
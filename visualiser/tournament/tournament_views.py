@@ -18,14 +18,18 @@
 Tournament Views for the Diplomacy Tournament Visualiser.
 """
 
+from collections import deque
 import csv
-from io import StringIO
+from io import TextIOWrapper
+from operator import itemgetter
 
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.forms.formsets import formset_factory
 from django.http import HttpResponse, Http404, HttpResponseRedirect
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 from django.utils.translation import gettext as _
@@ -41,7 +45,7 @@ from tournament.forms import SeederBiasForm
 
 from tournament.diplomacy import GameSet
 from tournament.models import Tournament, Game, SeederBias
-from tournament.models import TournamentPlayer, RoundPlayer, GamePlayer
+from tournament.models import RoundPlayer, GamePlayer
 from tournament.models import InvalidPreferenceList
 from tournament.news import news
 
@@ -80,12 +84,12 @@ def get_visible_tournament_or_404(pk, user):
     # Visible to all if published
     if t.is_published:
         return t
-    # Also visible if the user is a manager for the tournament
-    if user.is_active and t in user.tournament_set.all():
-        return t
     # Superusers see all
     if user.is_superuser:
         return t
+    # Also visible if the user is a manager for the tournament
+    if user.is_active and user.tournament_set.filter(pk=t.pk).exists():
+        return t
     # Default to not visible
     raise Http404
 
@@ -115,51 +119,52 @@ def tournament_scores(request,
                       redirect_url_name='tournament_scores_refresh'):
     """Display scores of a tournament"""
     t = get_visible_tournament_or_404(tournament_id, request.user)
-    tps = t.tournamentplayer_set.order_by('-score',
-                                          'player__last_name',
-                                          'player__first_name')
+    tps = t.tournamentplayer_set.select_related('player')
+    tps = tps.order_by('-score', 'player__last_name', 'player__first_name')
     rds = t.round_set.all()
     rounds = [r.number() for r in rds]
     # Grab the tournament scores and positions and round scores, all "if it ended now"
     t_positions_and_scores, r_scores = t.positions_and_scores()
-    # Construct a list of lists with [position, player name, round 1 score, ..., round n score, tournament score]
+    # Grab all the RoundPlayers in the tournament in one go, and work out
+    # how to format each one's round score, keyed by (player, round)
+    formats = {}
+    for rp in RoundPlayer.objects.filter(the_round__tournament=t):
+        if rp.game_count == 0:
+            # This player sat out the round
+            formats[(rp.player_id, rp.the_round_id)] = '%.2f*'
+        else:
+            formats[(rp.player_id, rp.the_round_id)] = '%.2f'
+    # Look up each round's scores just once, rather than once per player
+    rds_scores = [(r.id, r_scores.get(r)) for r in rds]
+    # Construct a list of dicts with position, TournamentPlayer, round scores and tournament score
     scores = []
     for p in tps:
         rs = []
-        for r in rds:
-            try:
-                rp = p.roundplayers().get(the_round=r)
-            except RoundPlayer.DoesNotExist:
+        for r_id, scores_for_r in rds_scores:
+            fmt = formats.get((p.player_id, r_id))
+            if fmt is None:
                 # This player didn't play this round
                 rs.append('')
             else:
-                str = '%.2f'
-                if rp.game_count == 0:
-                    # This player sat out the round
-                    str += '*'
-                rs.append(str % r_scores[r][p.player])
-        scores.append(['%d' % t_positions_and_scores[p.player][0]]
-                      + ['<a href="%s">%s</a>' % (p.get_absolute_url(), p.player)]
-                      + rs
-                      + ['%.2f' % t_positions_and_scores[p.player][1]])
+                rs.append(fmt % scores_for_r[p.player])
+        scores.append({'position': t_positions_and_scores[p.player][0],
+                       'player': p,
+                       'rounds': rs,
+                       'score': '%.2f' % t_positions_and_scores[p.player][1]})
     # sort rows by position (they'll retain the alphabetic sorting if equal)
-    scores.sort(key=lambda row: float(row[0]))
-    # After sorting, replace UNRANKED with suitable text
-    for row in scores:
-        row[0] = row[0].replace('%d' % Tournament.UNRANKED, _('Unranked'))
-    # Add one final row showing whether each round is ongoing or not
-    row = ['', '']
+    scores.sort(key=itemgetter('position'))
+    # One final row showing whether each round is ongoing or not
+    finals = []
     for r in rds:
         if r.is_finished():
-            row.append(_(u'Final'))
+            finals.append(_(u'Final'))
         else:
-            row.append('')
+            finals.append('')
     if t.is_finished():
-        row.append(_(u'Final'))
+        finals.append(_(u'Final'))
     else:
-        row.append('')
-    scores.append(row)
-    context = {'tournament': t, 'scores': scores, 'rounds': rounds}
+        finals.append('')
+    context = {'tournament': t, 'scores': scores, 'finals': finals, 'rounds': rounds}
     if refresh:
         context['refresh'] = True
         context['redirect_time'] = REFRESH_TIME
@@ -173,28 +178,31 @@ def tournament_game_results(request,
                             redirect_url_name='tournament_game_results_refresh'):
     """Display the results of all the games of a tournament"""
     t = get_visible_tournament_or_404(tournament_id, request.user)
-    tps = t.tournamentplayer_set.order_by('player__last_name', 'player__first_name')
-    rds = t.round_set.all()
+    tps = t.tournamentplayer_set.select_related('player')
+    tps = tps.order_by('player__last_name', 'player__first_name')
+    rds = t.round_set.prefetch_related('game_set')
     rounds = [r.number() for r in rds]
     # Grab the games for each round
     round_games = {}
     for r in rds:
         round_games[r] = r.game_set.all()
+    # Grab all the GamePlayers in the tournament in one go, keyed by (player, game),
+    # along with everything GamePlayer.result_str() needs
+    gps = {}
+    gp_qs = GamePlayer.objects.filter(game__the_round__tournament=t)
+    gp_qs = gp_qs.select_related('game__the_round__tournament', 'power')
+    for gp in gp_qs.prefetch_related('game__centrecount_set', 'game__drawproposal_set'):
+        gps[(gp.player_id, gp.game_id)] = gp
     # Construct a list of lists with [player name, round 1 game results, ..., round n game results]
     results = []
     for p in tps:
-        # All the games (in every tournament) this player has played in
-        gps = p.player.gameplayer_set.all()
         rs = []
         for r in rds:
             gs = ''
             for g in round_games[r]:
                 # Is this game one that this player played in?
-                try:
-                    gp = gps.get(game=g)
-                except GamePlayer.DoesNotExist:
-                    pass
-                else:
+                gp = gps.get((p.player_id, g.id))
+                if gp is not None:
                     # New line if they played multiple games in this round
                     if gs:
                         gs += '<br>'
@@ -225,15 +233,23 @@ def tournament_best_countries(request,
     t = get_visible_tournament_or_404(tournament_id, request.user)
     # We're going to need all the scores and URLs for every game in the tournament
     # Best to avoid deriving this information seven times for each game
+    # Keyed by Game id, with everything get_absolute_url() and scores() need fetched up front
     all_games = Game.objects.filter(the_round__tournament=t)
+    all_games = all_games.select_related('the_round__tournament')
+    all_games = all_games.prefetch_related('gameplayer_set__power', 'centrecount_set')
     all_urls_and_scores = {}
     for g in all_games:
-        all_urls_and_scores[g] = (g.get_absolute_url(), g.name, g.scores())
-    # gps is a dict, keyed by power, of lists of all gameplayers,
+        # Key the scores by power id, so we never need to touch gp.power
+        scores = {p.pk: v for p, v in g.scores().items()}
+        all_urls_and_scores[g.id] = (g.get_absolute_url(), g.name, scores)
+    # gps is a dict, keyed by power, of deques of all gameplayers,
     # sorted by best country criterion
-    gps = t.best_countries(True)
+    gps = {}
+    for power, gp_list in t.best_countries(True).items():
+        gps[power] = deque(gp_list)
     # We have to just pick a set here. Avalon Hill is most common in North America
     set_powers = GameSet.objects.get(name='Avalon Hill').setpower_set.order_by('power')
+    set_powers = list(set_powers.select_related('power'))
     # TODO Sort set_powers alphabetically by translated power.name
     rows = []
     # Add a row at a time, containing the best remaining result for each power
@@ -242,14 +258,15 @@ def tournament_best_countries(request,
         row = []
         for p in set_powers:
             try:
-                gp = gps[p.power].pop(0)
+                gp = gps[p.power].popleft()
             except IndexError:
                 continue
+            url, name, scores = all_urls_and_scores[gp.game_id]
             cell = '<a href="%s">%s</a><br/><a href="%s">%s</a><br/>%f' % (gp.tournamentplayer().get_absolute_url(),
                                                                            gp.player,
-                                                                           all_urls_and_scores[gp.game][0],  # URL
-                                                                           all_urls_and_scores[gp.game][1],  # name
-                                                                           all_urls_and_scores[gp.game][2][gp.power])  # score
+                                                                           url,
+                                                                           name,
+                                                                           scores[gp.power_id])
             if gp.tournamentplayer().unranked:
                 cell += '*'
             cell += '<br/>%d %s' % (gp.final_sc_count(),  # dots
@@ -307,43 +324,65 @@ def round_scores(request, tournament_id):
     PlayerRoundScoreFormset = formset_factory(PlayerRoundScoreForm,
                                               extra=0,
                                               formset=BasePlayerRoundScoreFormset)
+    # Number the Rounds once, rather than calling Round.number() repeatedly
+    rounds_by_number = {}
+    round_numbers = {}
+    for i, r in enumerate(t.round_set.all(), 1):
+        rounds_by_number[i] = r
+        round_numbers[r.id] = i
+    # Grab all the game scores in the tournament in one go, keyed by (player, round)
+    game_scores = {}
+    gps = GamePlayer.objects.filter(game__the_round__tournament=t)
+    for player_id, round_id, score in gps.values_list('player_id', 'game__the_round_id', 'score'):
+        game_scores.setdefault((player_id, round_id), []).append(str(score))
     data = []
     # Go through each player in the Tournament
-    for tp in t.tournamentplayer_set.all():
+    for tp in t.tournamentplayer_set.select_related('player'):
         current = {'tp': tp, 'player': tp.player, 'overall_score': tp.score}
         for rp in tp.roundplayers():
-            r = rp.the_round
-            round_num = r.number()
+            round_num = round_numbers[rp.the_round_id]
             current['round_%d' % round_num] = rp.score
             # Scores for any games in the round
-            games = GamePlayer.objects.filter(player=tp.player,
-                                              game__the_round=r).distinct()
-            current['game_scores_%d' % round_num] = ', '.join([str(g.score) for g in games])
+            scores = game_scores.get((tp.player_id, rp.the_round_id), [])
+            current['game_scores_%d' % round_num] = ', '.join(scores)
         data.append(current)
     formset = PlayerRoundScoreFormset(request.POST or None,
                                       tournament=t,
                                       initial=data)
     if formset.is_valid():
-        for form in formset:
-            tp = form.cleaned_data['tp']
-            for r_name, value in form.cleaned_data.items():
-                # Skip if no score was entered
-                if not value:
-                    continue
-                # We're only interested in the round score fields
-                if r_name.startswith('round_'):
-                    # Extract the round number from the field name
-                    i = int(r_name[6:])
-                    # Find that Round
-                    r = t.round_numbered(i)
+        # Map each round score field name to its Round, once for all the forms
+        round_fields = {}
+        for i, r in rounds_by_number.items():
+            round_fields['round_%d' % i] = r
+        # Existing RoundPlayers, keyed by (player, round), so we can update them in one go
+        rps = {}
+        for rp in RoundPlayer.objects.filter(the_round__tournament=t):
+            rps[(rp.player_id, rp.the_round_id)] = rp
+        changed = []
+        with transaction.atomic():
+            for form in formset:
+                tp = form.cleaned_data['tp']
+                for r_name, r in round_fields.items():
+                    value = form.cleaned_data.get(r_name)
+                    # Skip if no score was entered
+                    if not value:
+                        continue
                     # Update the score
-                    RoundPlayer.objects.update_or_create(player=tp.player,
-                                                         the_round=r,
-                                                         defaults={'score': value})
-                elif r_name == 'overall_score':
+                    rp = rps.get((tp.player_id, r.id))
+                    if rp is None:
+                        RoundPlayer.objects.create(player=tp.player,
+                                                   the_round=r,
+                                                   score=value)
+                    elif rp.score != value:
+                        rp.score = value
+                        changed.append(rp)
+                value = form.cleaned_data.get('overall_score')
+                if value:
                     # Store the player's tournament score
                     tp.score = value
                     tp.save()
+            if changed:
+                RoundPlayer.objects.bulk_update(changed, ['score'])
         # Redirect to the read-only version
         return HttpResponseRedirect(reverse('tournament_scores',
                                             args=(tournament_id,)))
@@ -358,10 +397,12 @@ def round_scores(request, tournament_id):
 def self_check_in_control(request, tournament_id):
     """Provide a form to control self-check-in for each round"""
     t = get_modifiable_tournament_or_404(tournament_id, request.user)
-    round_set = t.round_set.all()
+    # Number the Rounds once, rather than calling Round.number() repeatedly
+    rounds_by_number = {}
     enable_data = {}
-    for r in round_set.all():
-        enable_data['round_%d' % r.number()] = r.enable_check_in
+    for i, r in enumerate(t.round_set.all(), 1):
+        rounds_by_number[i] = r
+        enable_data['round_%d' % i] = r.enable_check_in
     form = EnableCheckInForm(request.POST or None,
                              tournament=t,
                              initial=enable_data)
@@ -370,7 +411,7 @@ def self_check_in_control(request, tournament_id):
             # Extract the round number from the field name
             i = int(r_name[6:])
             # Find that Round
-            rd = t.round_numbered(i)
+            rd = rounds_by_number[i]
             if (value is True) and not rd.enable_check_in:
                 # send emails if not already sent
                 if not rd.email_sent:
@@ -413,6 +454,11 @@ def enter_prefs(request, tournament_id):
                    'formset': formset})
 
 
+class _PrefsUploadError(Exception):
+    """Problem with an uploaded preferences file"""
+    pass
+
+
 @permission_required('tournament.add_preference')
 def upload_prefs(request, tournament_id):
     """Upload a CSV file to enter player country preferences"""
@@ -429,47 +475,42 @@ def upload_prefs(request, tournament_id):
             return HttpResponseRedirect(reverse('upload_prefs',
                                                 args=(tournament_id,)))
         # TODO How do I know what charset to use?
-        fp = StringIO(csv_file.read().decode('utf8'))
-        reader = csv.DictReader(fp)
-        for row in reader:
-            try:
-                tp = TournamentPlayer.objects.get(pk=row['Id'])
-            except KeyError:
-                messages.error(request, 'Failed to find player Id')
-                return HttpResponseRedirect(reverse('upload_prefs',
-                                                    args=(tournament_id,)))
-            p = tp.player
-            try:
-                if p.first_name != row['First Name']:
-                    messages.error(request, "Player first name doesn't match id")
-                    return HttpResponseRedirect(reverse('upload_prefs',
-                                                        args=(tournament_id,)))
-            except KeyError:
-                messages.error(request, 'Failed to find player First Name')
-                return HttpResponseRedirect(reverse('upload_prefs',
-                                                    args=(tournament_id,)))
-            try:
-                if p.last_name != row['Last Name']:
-                    messages.error(request, "Player last name doesn't match id")
-                    return HttpResponseRedirect(reverse('upload_prefs',
-                                                        args=(tournament_id,)))
-            except KeyError:
-                messages.error(request, 'Failed to find player Last Name')
-                return HttpResponseRedirect(reverse('upload_prefs',
-                                                    args=(tournament_id,)))
-            # Player data matches, so go ahead and parse the preferences
-            try:
-                ps = row['Preferences']
-            except KeyError:
-                messages.error(request, 'Failed to find player Preferences')
-                return HttpResponseRedirect(reverse('upload_prefs',
-                                                    args=(tournament_id,)))
-            try:
-                tp.create_preferences_from_string(ps)
-            except InvalidPreferenceList:
-                messages.error(request, 'Invalid preference string %s' % ps)
-                return HttpResponseRedirect(reverse('upload_prefs',
-                                                    args=(tournament_id,)))
+        fp = TextIOWrapper(csv_file.file, encoding='utf8', newline='')
+        rows = list(csv.DictReader(fp))
+        # Read all the listed TournamentPlayers in one go, keyed by id
+        ids = [row['Id'] for row in rows if row.get('Id')]
+        tps = t.tournamentplayer_set.select_related('player').in_bulk(ids)
+        # Any problem abandons the whole file, rolling back rows already stored
+        with transaction.atomic():
+            for row in rows:
+                try:
+                    tp = tps[int(row['Id'])]
+                except KeyError:
+                    raise _PrefsUploadError('Failed to find player Id')
+                p = tp.player
+                try:
+                    if p.first_name != row['First Name']:
+                        raise _PrefsUploadError("Player first name doesn't match id")
+                except KeyError:
+                    raise _PrefsUploadError('Failed to find player First Name')
+                try:
+                    if p.last_name != row['Last Name']:
+                        raise _PrefsUploadError("Player last name doesn't match id")
+                except KeyError:
+                    raise _PrefsUploadError('Failed to find player Last Name')
+                # Player data matches, so go ahead and parse the preferences
+                try:
+                    ps = row['Preferences']
+                except KeyError:
+                    raise _PrefsUploadError('Failed to find player Preferences')
+                try:
+                    tp.create_preferences_from_string(ps)
+                except InvalidPreferenceList:
+                    raise _PrefsUploadError('Invalid preference string %s' % ps)
+    except _PrefsUploadError as e:
+        messages.error(request, str(e))
+        return HttpResponseRedirect(reverse('upload_prefs',
+                                            args=(tournament_id,)))
     except Exception as e:
         messages.error(request, 'Unable to upload file: ' + repr(e))
 
@@ -477,11 +518,18 @@ def upload_prefs(request, tournament_id):
                                         args=(tournament_id,)))
 
 
+class _Echo:
+    """Pseudo-buffer for csv writers, which just returns each written row"""
+    def write(self, value):
+        return value
+
+
 def prefs_csv(request, tournament_id):
     """Download a template CSV file to enter player country preferences"""
     t = get_visible_tournament_or_404(tournament_id, request.user)
-    # Want the default player order
-    tps = t.tournamentplayer_set.all()
+    # Want the default player order, with everything prefs_string() needs
+    tps = t.tournamentplayer_set.select_related('player')
+    tps = tps.prefetch_related('preference_set__power')
     # What fields we want to write
     headers = ['Id',
                'First Name',
@@ -489,23 +537,25 @@ def prefs_csv(request, tournament_id):
                'Preferences',
               ]
 
-    response = HttpResponse(content_type='text/csv')
+    writer = csv.DictWriter(_Echo(), fieldnames=headers)
+
+    def rows():
+        yield writer.writeheader()
+        # One row per player (row order and field order don't matter)
+        for tp in tps:
+            p = tp.player
+            row_dict = {'Id': tp.id,
+                        'First Name': p.first_name,
+                        'Last Name': p.last_name,
+                        'Preferences': tp.prefs_string(),
+                       }
+            # Write this player's row out
+            yield writer.writerow(row_dict)
+
+    # Stream the rows out as they're generated
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="%s_%d_prefs.csv"' % (t.name,
                                                                                   t.start_date.year)
-
-    writer = csv.DictWriter(response, fieldnames=headers)
-    writer.writeheader()
-    # One row per player (row order and field order don't matter)
-    for tp in tps:
-        p = tp.player
-        row_dict = {'Id': tp.id,
-                    'First Name': p.first_name,
-                    'Last Name': p.last_name,
-                    'Preferences': tp.prefs_string(),
-                   }
-        # Write this player's row out
-        writer.writerow(row_dict)
-
     return response
 
 
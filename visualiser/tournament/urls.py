@@ -14,160 +14,260 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from django.conf.urls import url, include
+from functools import wraps
+
+from django.conf import settings
+from django.urls import include, path, register_converter
+from django.urls.converters import IntConverter, StringConverter
+from django.views.decorators.cache import cache_page
 
 from tournament import game_views
 from tournament import round_views
 from tournament import tournament_views
 from tournament import tournament_player_views
 from tournament import wdd_views
+from tournament.models import Game, Tournament
+
+
+class GameNameConverter(StringConverter):
+    """Word characters or hyphens, up to Game.MAX_NAME_LENGTH of them."""
+    regex = r'[\w-]{1,%d}' % Game.MAX_NAME_LENGTH
+
+
+class TurnConverter(StringConverter):
+    """
+    Turns are things like S1901M.
+    Empty for game_image_seq when there's no later image.
+    """
+    regex = r'\w*'
+
+
+class YearConverter(IntConverter):
+    """A four (or more) digit game year."""
+    regex = '[0-9]{4,}'
+
+
+register_converter(GameNameConverter, 'game_name')
+register_converter(TurnConverter, 'turn')
+register_converter(YearConverter, 'year')
+
+
+def _flatten(prefix, patterns):
+    """
+    Returns a copy of patterns with prefix prepended to each route.
+    Used in place of include() so that each URL within a tournament is
+    resolved by a single regex match rather than by a chain of nested resolvers.
+    """
+    return [path(prefix + str(p.pattern),
+                 p.callback,
+                 p.default_args,
+                 name=p.name)
+            for p in patterns]
+
+
+def _cached(view):
+    """
+    Wraps one of the read-only pages that render tournament data
+    so that it is served from the 'pages' cache.
+    Only anonymous requests for published tournaments use the cache,
+    because cache_page() doesn't see the Vary: Cookie that the session adds.
+    Logged-in users can see unpublished tournaments and extra links,
+    so their pages are always rendered afresh and never stored.
+    Entries are dropped from the cache whenever the data changes.
+    """
+    cached_view = cache_page(settings.PAGE_CACHE_SECONDS, cache='pages')(view)
+
+    @wraps(view)
+    def wrapper(request, *args, tournament_id, **kwargs):
+        if (request.user.is_authenticated
+                or not Tournament.objects.filter(pk=tournament_id, is_published=True).exists()):
+            return view(request, *args, tournament_id=tournament_id, **kwargs)
+        return cached_view(request, *args, tournament_id=tournament_id, **kwargs)
+
+    return wrapper
+
 
 round_patterns = [
-    url(r'^$', round_views.round_simple,
-        {'template': 'detail'}, name='round_detail'),
-    url(r'^roll_call/$', round_views.roll_call, name='round_roll_call'),
-    url(r'^get_seven/$', round_views.get_seven, name='get_seven'),
-    url(r'^seed_games/$', round_views.seed_games, name='seed_games'),
-    url(r'^create_games/$', round_views.create_games, name='create_games'),
-    url(r'^game_scores/$', round_views.game_scores, name='game_scores'),
-    url(r'^games/$', round_views.game_index, name='game_index'),
-    url(r'^board_call_csv/$', round_views.board_call_csv, name='board_call_csv'),
-    url(r'^board_call/$', round_views.round_simple,
-        {'template': 'board_call'}, name='board_call'),
-    url(r'^blind_auction_csv/$', round_views.blind_auction_csv,
-        name='blind_auction_csv'),
+    path('', _cached(round_views.round_simple),
+         {'template': 'detail'}, name='round_detail'),
+    path('roll_call/', round_views.roll_call, name='round_roll_call'),
+    path('get_seven/', round_views.get_seven, name='get_seven'),
+    path('seed_games/', round_views.seed_games, name='seed_games'),
+    path('create_games/', round_views.create_games, name='create_games'),
+    path('game_scores/', round_views.game_scores, name='game_scores'),
+    path('games/', _cached(round_views.game_index), name='game_index'),
+    path('board_call_csv/', round_views.board_call_csv, name='board_call_csv'),
+    path('board_call/', round_views.round_simple,
+         {'template': 'board_call'}, name='board_call'),
+    path('blind_auction_csv/', round_views.blind_auction_csv,
+         name='blind_auction_csv'),
 ]
 
 game_patterns = [
-    url(r'^$', game_views.game_simple,
-        {'template': 'detail'}, name='game_detail'),
-    url(r'^sc_chart/$', game_views.game_sc_chart, name='game_sc_chart'),
-    url(r'^sc_chart_refresh/$', game_views.game_sc_chart,
-        {'refresh': True}, name='game_sc_chart_refresh'),
-    url(r'^enter_scs/$', game_views.sc_counts, name='enter_scs'),
-    url(r'^sc_owners/$', game_views.game_sc_owners, name='game_sc_owners'),
-    url(r'^sc_owners_refresh/$', game_views.game_sc_owners,
-        {'refresh': True}, name='game_sc_owners_refresh'),
-    url(r'^enter_sc_owners/$', game_views.sc_owners, name='enter_sc_owners'),
+    path('', game_views.game_simple,
+         {'template': 'detail'}, name='game_detail'),
+    path('sc_chart/', _cached(game_views.game_sc_chart), name='game_sc_chart'),
+    path('sc_chart_refresh/', _cached(game_views.game_sc_chart),
+         {'refresh': True}, name='game_sc_chart_refresh'),
+    path('enter_scs/', game_views.sc_counts, name='enter_scs'),
+    path('sc_owners/', game_views.game_sc_owners, name='game_sc_owners'),
+    path('sc_owners_refresh/', game_views.game_sc_owners,
+         {'refresh': True}, name='game_sc_owners_refresh'),
+    path('enter_sc_owners/', game_views.sc_owners, name='enter_sc_owners'),
     # Always the latest position
-    url(r'^positions/latest/$', game_views.game_image,
-        {'turn': '', 'timelapse': True}, name='current_game_image'),
+    path('positions/latest/', game_views.game_image,
+         {'turn': '', 'timelapse': True}, name='current_game_image'),
     # Fixed at the specified turn
-    url(r'^positions/(?P<turn>\w+)/$', game_views.game_image, name='game_image'),
+    path('positions/<turn:turn>/', game_views.game_image, name='game_image'),
     # Cycle through all images, from S1901M
-    url(r'^timelapse/$', game_views.game_image,
-        {'turn': 'S1901M', 'timelapse': True}, name='game_timelapse'),
+    path('timelapse/', game_views.game_image,
+         {'turn': 'S1901M', 'timelapse': True}, name='game_timelapse'),
     # Same as either current_game_image or game_timelapse, depending on turn
     # This is the URL they both redirect to. Don't expect users to go there
     # TODO Begs the question of why not just use this one...
-    url(r'^timelapse/(?P<turn>\w*)/$', game_views.game_image,
-        {'timelapse': True}, name='game_image_seq'),
-    url(r'^add_position/$', game_views.add_game_image, name='add_game_image'),
-    url(r'^news/$', game_views.game_news, name='game_news'),
-    url(r'^news/(?P<for_year>\d{4,})/$', game_views.game_news,
-        name='game_news_for_year'),
-    url(r'^news_ticker/$', game_views.game_news,
-        {'as_ticker': True}, name='game_news_ticker'),
-    url(r'^background/$', game_views.game_background, name='game_background'),
-    url(r'^background_ticker/$', game_views.game_background,
-        {'as_ticker': True}, name='game_background_ticker'),
-    url(r'^ticker/$', game_views.game_simple,
-        {'template': 'ticker'}, name='game_ticker'),
-    url(r'^draw_vote/$', game_views.draw_vote, name='draw_vote'),
-    url(r'^views/$', game_views.game_simple,
-        {'template': 'view'}, name='game_views'),
+    path('timelapse/<turn:turn>/', game_views.game_image,
+         {'timelapse': True}, name='game_image_seq'),
+    path('add_position/', game_views.add_game_image, name='add_game_image'),
+    path('news/', _cached(game_views.game_news), name='game_news'),
+    path('news/<year:for_year>/', _cached(game_views.game_news),
+         name='game_news_for_year'),
+    path('news_ticker/', game_views.game_news,
+         {'as_ticker': True}, name='game_news_ticker'),
+    path('background/', _cached(game_views.game_background), name='game_background'),
+    path('background_ticker/', game_views.game_background,
+         {'as_ticker': True}, name='game_background_ticker'),
+    path('ticker/', game_views.game_simple,
+         {'template': 'ticker'}, name='game_ticker'),
+    path('draw_vote/', game_views.draw_vote, name='draw_vote'),
+    path('views/', game_views.game_simple,
+         {'template': 'view'}, name='game_views'),
     # These three go together as a cycle
-    url(r'^overview/$', game_views.game_sc_chart,
-        {'refresh': True, 'redirect_url_name': 'game_overview_2'},
-        name='game_overview'),
-    url(r'^overview2/$', game_views.game_sc_owners,
-        {'refresh': True, 'redirect_url_name': 'game_overview_3'},
-        name='game_overview_2'),
-    url(r'^overview3/$', game_views.game_image,
-        {'timelapse': True, 'redirect_url_name': 'game_overview'},
-        name='game_overview_3'),
-    url(r'^scrape_backstabbr/$', game_views.scrape_backstabbr,
-        name='scrape_backstabbr'),
-    url(r'^aar/(?P<player_id>\d+)/$', game_views.aar,
-        name='aar'),
+    path('overview/', _cached(game_views.game_sc_chart),
+         {'refresh': True, 'redirect_url_name': 'game_overview_2'},
+         name='game_overview'),
+    path('overview2/', game_views.game_sc_owners,
+         {'refresh': True, 'redirect_url_name': 'game_overview_3'},
+         name='game_overview_2'),
+    path('overview3/', game_views.game_image,
+         {'timelapse': True, 'redirect_url_name': 'game_overview'},
+         name='game_overview_3'),
+    path('scrape_backstabbr/', game_views.scrape_backstabbr,
+         name='scrape_backstabbr'),
+    path('aar/<int:player_id>/', game_views.aar,
+         name='aar'),
 ]
 
 tp_patterns = [
-    url(r'^$', tournament_player_views.index,
-        name='tournament_players'),
-    url(r'^(?P<tp_id>\d+)/$', tournament_player_views.detail,
-        name='tournament_player_detail'),
+    path('', tournament_player_views.index,
+         name='tournament_players'),
+    path('<int:tp_id>/', tournament_player_views.detail,
+         name='tournament_player_detail'),
 ]
 
 tournament_patterns = [
-    url(r'^$', tournament_views.tournament_simple,
-        {'template': 'detail'}, name='tournament_detail'),
-    url(r'^framesets/$', tournament_views.tournament_simple,
-        {'template': 'frameset_picker'}, name='framesets'),
-    url(r'^frameset_3x3/$', tournament_views.tournament_simple,
-        {'template': 'frameset_3x3'}, name='frameset_3x3'),
-    url(r'^frameset_top_board/$', tournament_views.tournament_simple,
-        {'template': 'frameset_top_board'}, name='frameset_top_board'),
-    url(r'^frameset_2x2/$', tournament_views.tournament_simple,
-        {'template': 'frameset_2x2'}, name='frameset_2x2'),
-    url(r'^frameset_1x1/$', tournament_views.tournament_simple,
-        {'template': 'frameset_1x1'}, name='frameset_1x1'),
-    url(r'^views/$', tournament_views.tournament_simple,
-        {'template': 'view'}, name='tournament_views'),
+    path('', tournament_views.tournament_simple,
+         {'template': 'detail'}, name='tournament_detail'),
+    path('framesets/', tournament_views.tournament_simple,
+         {'template': 'frameset_picker'}, name='framesets'),
+    path('frameset_3x3/', tournament_views.tournament_simple,
+         {'template': 'frameset_3x3'}, name='frameset_3x3'),
+    path('frameset_top_board/', tournament_views.tournament_simple,
+         {'template': 'frameset_top_board'}, name='frameset_top_board'),
+    path('frameset_2x2/', tournament_views.tournament_simple,
+         {'template': 'frameset_2x2'}, name='frameset_2x2'),
+    path('frameset_1x1/', tournament_views.tournament_simple,
+         {'template': 'frameset_1x1'}, name='frameset_1x1'),
+    path('views/', tournament_views.tournament_simple,
+         {'template': 'view'}, name='tournament_views'),
     # These three go together as a cycle
-    url(r'^overview/$', tournament_views.tournament_scores,
-        {'refresh': True, 'redirect_url_name': 'tournament_overview_2'},
-        name='tournament_overview'),
-    url(r'^overview2/$', tournament_views.tournament_game_results,
-        {'refresh': True, 'redirect_url_name': 'tournament_overview_3'},
-        name='tournament_overview_2'),
-    url(r'^overview3/$', tournament_views.tournament_best_countries,
-        {'refresh': True, 'redirect_url_name': 'tournament_overview'},
-        name='tournament_overview_3'),
-    url(r'^scores/$', tournament_views.tournament_scores, name='tournament_scores'),
-    url(r'^scores_refresh/$', tournament_views.tournament_scores,
-        {'refresh': True}, name='tournament_scores_refresh'),
-    url(r'^game_results/$', tournament_views.tournament_game_results,
-        name='tournament_game_results'),
-    url(r'^game_results_refresh/$', tournament_views.tournament_game_results,
-        {'refresh': True}, name='tournament_game_results_refresh'),
-    url(r'^best_countries/$', tournament_views.tournament_best_countries,
-        name='tournament_best_countries'),
-    url(r'^best_countries_refresh/$', tournament_views.tournament_best_countries,
-        {'refresh': True}, name='tournament_best_countries_refresh'),
-    url(r'^enter_scores/$', tournament_views.round_scores, name='enter_scores'),
-    url(r'^self_check_in/$', tournament_views.self_check_in_control,
-        name='self_check_in_control'),
-    url(r'^current_round/$', tournament_views.tournament_round, name='tournament_round'),
+    path('overview/', _cached(tournament_views.tournament_scores),
+         {'refresh': True, 'redirect_url_name': 'tournament_overview_2'},
+         name='tournament_overview'),
+    path('overview2/', _cached(tournament_views.tournament_game_results),
+         {'refresh': True, 'redirect_url_name': 'tournament_overview_3'},
+         name='tournament_overview_2'),
+    path('overview3/', _cached(tournament_views.tournament_best_countries),
+         {'refresh': True, 'redirect_url_name': 'tournament_overview'},
+         name='tournament_overview_3'),
+    path('scores/', _cached(tournament_views.tournament_scores), name='tournament_scores'),
+    path('scores_refresh/', _cached(tournament_views.tournament_scores),
+         {'refresh': True}, name='tournament_scores_refresh'),
+    path('game_results/', _cached(tournament_views.tournament_game_results),
+         name='tournament_game_results'),
+    path('game_results_refresh/', _cached(tournament_views.tournament_game_results),
+         {'refresh': True}, name='tournament_game_results_refresh'),
+    path('best_countries/', _cached(tournament_views.tournament_best_countries),
+         name='tournament_best_countries'),
+    path('best_countries_refresh/', _cached(tournament_views.tournament_best_countries),
+         {'refresh': True}, name='tournament_best_countries_refresh'),
+    path('enter_scores/', tournament_views.round_scores, name='enter_scores'),
+    path('self_check_in/', tournament_views.self_check_in_control,
+         name='self_check_in_control'),
+    path('current_round/', tournament_views.tournament_round, name='tournament_round'),
     # TODO Why does this one calls into game_views ?
-    url(r'^game_image/$', game_views.add_game_image, name='add_game_image'),
-    url(r'^news/$', tournament_views.tournament_news, name='tournament_news'),
-    url(r'^news_ticker/$', tournament_views.tournament_news,
-        {'as_ticker': True}, name='tournament_news_ticker'),
-    url(r'^background/$', tournament_views.tournament_background,
-        name='tournament_background'),
-    url(r'^ticker/$', tournament_views.tournament_simple,
-        {'template': 'ticker'}, name='tournament_ticker'),
-    url(r'^background_ticker/$', tournament_views.tournament_background,
-        {'as_ticker': True}, name='tournament_background_ticker'),
-    url(r'^rounds/$', tournament_views.round_index, name='round_index'),
-    url(r'^csv_classification/$', wdd_views.view_classification_csv,
-        name='csv_classification'),
-    url(r'^csv_boards/$', wdd_views.view_boards_csv, name='csv_boards'),
-    url(r'^prefs/$', tournament_views.enter_prefs, name='enter_prefs'),
-    url(r'^upload_prefs/$', tournament_views.upload_prefs, name='upload_prefs'),
-    url(r'^prefs_csv/$', tournament_views.prefs_csv, name='prefs_csv'),
-    url(r'^seeder_bias/$', tournament_views.seeder_bias, name='seeder_bias'),
-    url(r'^player_prefs/(?P<uuid>[^/]+)/$', tournament_player_views.player_prefs,
-        name='player_prefs'),
-    url(r'^auction_bids/(?P<uuid>[^/]+)/$', tournament_player_views.auction_bids,
-        name='auction_bids'),
-    url(r'^players/', include(tp_patterns)),
-    url(r'^rounds/(?P<round_num>\d+)/', include(round_patterns)),
-    url(r'^games/(?P<game_name>\w+)/', include(game_patterns)),
+    path('game_image/', game_views.add_game_image, name='add_game_image'),
+    path('news/', _cached(tournament_views.tournament_news), name='tournament_news'),
+    path('news_ticker/', tournament_views.tournament_news,
+         {'as_ticker': True}, name='tournament_news_ticker'),
+    path('background/', _cached(tournament_views.tournament_background),
+         name='tournament_background'),
+    path('ticker/', tournament_views.tournament_simple,
+         {'template': 'ticker'}, name='tournament_ticker'),
+    path('background_ticker/', tournament_views.tournament_background,
+         {'as_ticker': True}, name='tournament_background_ticker'),
+    path('rounds/', _cached(tournament_views.round_index), name='round_index'),
+    path('csv_classification/', wdd_views.view_classification_csv,
+         name='csv_classification'),
+    path('csv_boards/', wdd_views.view_boards_csv, name='csv_boards'),
+    path('prefs/', tournament_views.enter_prefs, name='enter_prefs'),
+    path('upload_prefs/', tournament_views.upload_prefs, name='upload_prefs'),
+    path('prefs_csv/', tournament_views.prefs_csv, name='prefs_csv'),
+    path('seeder_bias/', tournament_views.seeder_bias, name='seeder_bias'),
+    path('player_prefs/<str:uuid>/', tournament_player_views.player_prefs,
+         name='player_prefs'),
+    path('auction_bids/<str:uuid>/', tournament_player_views.auction_bids,
+         name='auction_bids'),
+    *_flatten('players/', tp_patterns),
+    *_flatten('rounds/<int:round_num>/', round_patterns),
+    *_flatten('games/<game_name:game_name>/', game_patterns),
 ]
 
-urlpatterns = [
-    url(r'^$', tournament_views.tournament_index, name='index'),
-    url(r'^(?P<tournament_id>\d+)/', include(tournament_patterns)),
+# Django tries patterns in order, so move the most requested pages
+# to the front. The self-refreshing pages shown on the venue screens
+# dominate the traffic, followed by the main game and tournament pages.
+# Every pattern is anchored at both ends and the sort is stable, so this
+# doesn't change which view any URL resolves to (current_game_image is
+# still tried before game_image for positions/latest/).
+_BUSIEST = [
+    'tournament_overview',
+    'tournament_overview_2',
+    'tournament_overview_3',
+    'game_overview',
+    'game_overview_2',
+    'game_overview_3',
+    'game_sc_chart_refresh',
+    'game_sc_owners_refresh',
+    'tournament_scores_refresh',
+    'tournament_game_results_refresh',
+    'tournament_best_countries_refresh',
+    'tournament_news_ticker',
+    'tournament_background_ticker',
+    'game_news_ticker',
+    'game_background_ticker',
+    'current_game_image',
+    'game_image_seq',
+    'game_detail',
+    'game_sc_chart',
+    'tournament_detail',
+    'tournament_scores',
 ]
+tournament_patterns.sort(key=lambda p: (_BUSIEST.index(p.name)
+                                        if p.name in _BUSIEST else len(_BUSIEST)))
+
+# Every page except the index is under a single tournament_id resolver,
+# so that prefix is only matched once however deep the URL is.
+# A tuple, because nothing should modify the patterns once they're built
+urlpatterns = (
+    path('', tournament_views.tournament_index, name='index'),
+    path('<int:tournament_id>/', include(tournament_patterns)),
+)
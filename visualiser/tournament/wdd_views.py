@@ -19,24 +19,30 @@ WDD Views for the Diplomacy Tournament Visualiser.
 """
 
 import csv
+from collections import Counter
+from functools import lru_cache
 
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 
-from tournament.diplomacy import GreatPower
-from tournament.diplomacy import FIRST_YEAR
-from tournament.models import Game, Tournament
-from tournament.models import GamePlayer
+from tournament.diplomacy import get_all_powers
+from tournament.diplomacy import FIRST_YEAR, WINNING_SCS
+from tournament.models import CentreCount, DrawProposal, Game, Tournament
+from tournament.models import GamePlayer, RoundPlayer
 from tournament.tournament_views import get_visible_tournament_or_404
+from tournament.tournament_views import _Echo
 
 # CSV export for WDD
 
 
+@lru_cache(maxsize=None)
 def _power_name_to_wdd(name):
     """Map a power name to a WDD country code"""
     # 0 for variant (standard), plus first two letters of the country name (in English)
     return '0%s' % name[0:2].upper()
 
 
+@lru_cache(maxsize=None)
 def _centrecount_year_to_wdd(year):
     """Map a year to a WDD centrecount column name"""
     return 'CT_%02d' % (year % (FIRST_YEAR-1))
@@ -45,19 +51,45 @@ def _centrecount_year_to_wdd(year):
 def view_classification_csv(request, tournament_id):
     """Return a WDD-compatible "classification" CSV file for the tournament"""
     t = get_visible_tournament_or_404(tournament_id, request.user)
-    tps = t.tournamentplayer_set.order_by('-score')
-    # Grab the tournament scores and positions, "if it ended now"
-    t_positions_and_scores = t.positions_and_scores()[0]
+    tps = t.tournamentplayer_set.select_related('player').order_by('-score')
+    # Grab the tournament scores and positions, "if it ended now", keyed by player id
+    t_positions_and_scores = {p.id: v for p, v in t.positions_and_scores()[0].items()}
+    # Number of each round, keyed by round id
+    round_nums = {r_id: i for i, r_id in enumerate(t.round_set.values_list('id', flat=True), 1)}
+    # (round number, score) for every RoundPlayer, keyed by player id
+    player_rps = {}
+    rps = RoundPlayer.objects.filter(the_round__tournament=t)
+    for p_id, r_id, score in rps.values_list('player_id', 'the_round_id', 'score'):
+        player_rps.setdefault(p_id, []).append((round_nums[r_id], score))
     # Grab the best country rankings
     best_countries = t.best_countries()
+    # Invert that, so we have the first best country GamePlayer for each power
+    # in a dict, keyed by power, for each player
+    player_bc = {}
+    for power, bc in best_countries.items():
+        for gp in bc:
+            player_bc.setdefault(gp.player_id, {}).setdefault(power, gp)
+    # Final centre counts for those games, keyed by (game, power)
+    bc_dots = {}
+    bc_game_ids = {gp.game_id for bc in best_countries.values() for gp in bc}
+    cc_qs = CentreCount.objects.filter(game__in=bc_game_ids).order_by('year')
+    for g_id, p_id, count in cc_qs.values_list('game_id', 'power_id', 'count'):
+        bc_dots[(g_id, p_id)] = count
     # Grab the top board, if any
-    try:
-        top_board = Game.objects.get(is_top_board=True,
-                                     the_round__tournament=t)
+    top_board = Game.objects.filter(is_top_board=True,
+                                    the_round__tournament=t).select_related('the_round').first()
+    if top_board:
         tb_positions = top_board.positions()
-        tb_dots = top_board.centrecount_set.filter(year__gt=1900)
-    except Game.DoesNotExist:
-        top_board = None
+        tb_round_num = round_nums[top_board.the_round_id]
+        # The top board's GamePlayers, keyed by player
+        tb_gps = {}
+        for gp in top_board.gameplayer_set.select_related('power'):
+            tb_gps[gp.player_id] = gp
+        # Latest centre count for each power on the top board, keyed by power
+        tb_dots = {}
+        tb_ccs = top_board.centrecount_set.filter(year__gt=1900).order_by('year')
+        for p_id, count in tb_ccs.values_list('power_id', 'count'):
+            tb_dots[p_id] = count
     # What fields we want to write
     headers = ['FIRST NAME',
                'NAME',
@@ -70,13 +102,12 @@ def view_classification_csv(request, tournament_id):
     for i in range(1, 9):
         headers.append('R%d' % i)
     # Best country stuff
-    for p in GreatPower.objects.all():
+    # (RK, PT, CT, HEAT, BOARD) column names, keyed by power
+    bc_headers = {}
+    for p in get_all_powers():
         wdd_pwr = _power_name_to_wdd(p.name)
-        headers.append('RK_%s' % wdd_pwr)
-        headers.append('PT_%s' % wdd_pwr)
-        headers.append('CT_%s' % wdd_pwr)
-        headers.append('HEAT_%s' % wdd_pwr)
-        headers.append('BOARD_%s' % wdd_pwr)
+        bc_headers[p] = tuple('%s_%s' % (field, wdd_pwr) for field in ('RK', 'PT', 'CT', 'HEAT', 'BOARD'))
+        headers.extend(bc_headers[p])
     # Top Board stuff
     # Only add these headers if there was a top board
     if top_board:
@@ -87,63 +118,62 @@ def view_classification_csv(request, tournament_id):
         headers.append('CT_TOPBOARD')
         headers.append('COUNTRY_TOPBOARD')
 
-    response = HttpResponse(content_type='text/csv')
+    # Position of each field in a row
+    col = {h: i for i, h in enumerate(headers)}
+    writer = csv.writer(_Echo())
+
+    def rows():
+        """Generate each line of the CSV file in turn"""
+        yield writer.writerow(headers)
+        # No. of players with each score
+        score_counts = Counter(s for _, s in t_positions_and_scores.values())
+        # One row per player (row order and field order don't matter)
+        for tp in tps:
+            rank, p_score = t_positions_and_scores[tp.player_id]
+            if rank == Tournament.UNRANKED:
+                rank = '999'
+            # First the stuff that is global to the tournament and applies to all players
+            names = tp.player.wdd_firstname_lastname()
+            row = [''] * len(headers)
+            row[col['FIRST NAME']] = names[0]
+            row[col['NAME']] = names[1]
+            row[col['HOMONYME']] = '1'  # User Guide says "Set to 1"
+            row[col['RANK']] = rank
+            # No. of players with the same rank
+            row[col['EXAEQUO']] = score_counts[p_score]
+            row[col['SCORE']] = p_score
+            # Add in round score for each round played
+            for r_num, score in player_rps.get(tp.player_id, []):
+                row[col['R%d' % r_num]] = score
+            # Add best country fields if any
+            for power, gp in player_bc.get(tp.player_id, {}).items():
+                rk, pt, ct, heat, board = bc_headers[power]
+                row[col[rk]] = 1
+                row[col[pt]] = gp.score
+                row[col[ct]] = bc_dots[(gp.game_id, power.id)]
+                row[col[heat]] = round_nums[gp.game.the_round_id]
+                # We store boards as names, not numbers
+                # g.id is globally-unique. What we really want is number within the round
+                row[col[board]] = gp.game_id
+            # Add top board fields if applicable
+            if top_board:
+                gp = tb_gps.get(tp.player_id)
+                # Did this player make the top board?
+                if gp is not None:
+                    row[col['NAME_TOPBOARD']] = 'A'  # This seems to be arbitrary
+                    row[col['HEAT_TOPBOARD']] = tb_round_num
+                    row[col['BOARD_TOPBOARD']] = top_board.id
+                    row[col['RK_TOPBOARD']] = tb_positions[gp.power]
+                    row[col['CT_TOPBOARD']] = tb_dots[gp.power_id]
+                    # TODO Not certain that this is the correct value
+                    row[col['COUNTRY_TOPBOARD']] = _power_name_to_wdd(gp.power.name)
+            # Write this player's row out
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="%s%dclassification.csv"' % (t.name,
                                                                                          t.start_date.year)
 
-    writer = csv.DictWriter(response, fieldnames=headers)
-    writer.writeheader()
-    # One row per player (row order and field order don't matter)
-    for tp in tps:
-        p = tp.player
-        p_score = t_positions_and_scores[p][1]
-        rank = t_positions_and_scores[p][0]
-        if rank == Tournament.UNRANKED:
-            rank = '999'
-        # First the stuff that is global to the tournament and applies to all players
-        names = p.wdd_firstname_lastname()
-        row_dict = {'FIRST NAME': names[0],
-                    'NAME': names[1],
-                    'HOMONYME': '1',  # User Guide says "Set to 1"
-                    'RANK': rank,
-                    # No. of players with the same rank
-                    'EXAEQUO': len([s for _, s in t_positions_and_scores.values() if s == p_score]),
-                    'SCORE': p_score,
-                   }
-        # Add in round score for each round played
-        for rp in tp.roundplayers():
-            row_dict['R%d' % rp.the_round.number()] = rp.score
-        # Add best country fields if any
-        for power, bc in best_countries.items():
-            # Did this player win best country with this power?
-            for gp in bc:
-                if gp.player == p:
-                    wdd_pwr = _power_name_to_wdd(power.name)
-                    row_dict['RK_%s' % wdd_pwr] = 1
-                    row_dict['PT_%s' % wdd_pwr] = gp.score
-                    row_dict['CT_%s' % wdd_pwr] = gp.game.centrecount_set.filter(power=power).last().count
-                    row_dict['HEAT_%s' % wdd_pwr] = gp.game.the_round.number()
-                    # We store boards as names, not numbers
-                    # g.id is globally-unique. What we really want is number within the round
-                    row_dict['BOARD_%s' % wdd_pwr] = gp.game.id
-                    break
-        # Add top board fields if applicable
-        if top_board:
-            try:
-                gp = top_board.gameplayer_set.get(player=p)
-                row_dict['NAME_TOPBOARD'] = 'A'  # This seems to be arbitrary
-                row_dict['HEAT_TOPBOARD'] = top_board.the_round.number()
-                row_dict['BOARD_TOPBOARD'] = top_board.id
-                row_dict['RK_TOPBOARD'] = tb_positions[gp.power]
-                row_dict['CT_TOPBOARD'] = tb_dots.filter(power=gp.power).last().count
-                # TODO Not certain that this is the correct value
-                row_dict['COUNTRY_TOPBOARD'] = _power_name_to_wdd(gp.power.name)
-            except GamePlayer.DoesNotExist:
-                # This player did not make the top board
-                pass
-        # Write this player's row out
-        writer.writerow(row_dict)
-
     return response
 
 
@@ -168,59 +198,91 @@ def view_boards_csv(request, tournament_id):
     for i in range(1, 21):
         headers.append('CT_%02d' % i)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="%s%dboards.csv"' % (t.name,
-                                                                                 t.start_date.year)
+    # Position of each field in a row
+    col = {h: i for i, h in enumerate(headers)}
+    writer = csv.writer(_Echo())
 
-    writer = csv.DictWriter(response, fieldnames=headers)
-    writer.writeheader()
-
-    # One row per game, per player
-    r_row_dict = {}
-    r_row_dict['HOMONYME'] = '1'  # User Guide says "Set to 1"
-    for r in t.round_set.all():
-        r_row_dict['ROUND'] = r.number()
-        g_row_dict = r_row_dict.copy()
-        for g in r.game_set.all():
-            # We store boards as names, not numbers
-            # g.id is globally-unique. What we really want is number within the round
-            g_row_dict['BOARD'] = g.id
-            positions = g.positions()
-            draw = g.passed_draw()
-            soloer = g.soloer()
-            # TODO This is broken with replacement players
-            for gp in g.gameplayer_set.all():
-                names = gp.player.wdd_firstname_lastname()
-                row_dict = g_row_dict.copy()
-                row_dict['FIRST NAME'] = names[0]
-                row_dict['NAME'] = names[1]
-                row_dict['COUNTRY'] = _power_name_to_wdd(gp.power.name)
-                row_dict['SCORE'] = gp.score
-                rank = positions[gp.power]
-                row_dict['RANK'] = rank
-                row_dict['EXAEQUO'] = len([r for r in positions.values() if r == rank])
-                dots = g.centrecount_set.filter(power=gp.power).filter(year__gt=1900)
-                # How did the game end?
-                if soloer is not None:
-                    if soloer == gp:
-                        # This player won
-                        row_dict['DRAW'] = 1
-                    else:
-                        # Another player won
-                        row_dict['DRAW'] = 0
+    def rows():
+        """Generate each line of the CSV file in turn"""
+        yield writer.writerow(headers)
+
+        # Grab all the CentreCounts for the tournament in one go,
+        # as (year, count) lists keyed by (game, power)
+        # and note the soloing power (if any) for each game
+        # and the elimination year (the first with no centres) for each (game, power) as we go
+        ccs = {}
+        solo_power_ids = {}
+        elim_years = {}
+        cc_qs = CentreCount.objects.filter(game__the_round__tournament=t).order_by('year')
+        for g_id, p_id, year, count in cc_qs.values_list('game_id', 'power_id', 'year', 'count'):
+            ccs.setdefault((g_id, p_id), []).append((year, count))
+            if count >= WINNING_SCS:
+                solo_power_ids[g_id] = p_id
+            elif count == 0:
+                elim_years.setdefault((g_id, p_id), year)
+        gps = GamePlayer.objects.select_related('player', 'power')
+        draws = DrawProposal.objects.filter(passed=True)
+        games = Game.objects.prefetch_related(Prefetch('gameplayer_set', queryset=gps),
+                                              Prefetch('drawproposal_set',
+                                                       queryset=draws,
+                                                       to_attr='passed_draws'))
+
+        # One row per game, per player
+        # Each row starts as a copy of the fields shared by the whole game
+        template = [''] * len(headers)
+        template[col['HOMONYME']] = '1'  # User Guide says "Set to 1"
+        for r_num, r in enumerate(t.round_set.prefetch_related(Prefetch('game_set', queryset=games)), 1):
+            template[col['ROUND']] = r_num
+            for g in r.game_set.all():
+                # We store boards as names, not numbers
+                # g.id is globally-unique. What we really want is number within the round
+                template[col['BOARD']] = g.id
+                positions = g.positions()
+                rank_counts = Counter(positions.values())
+                # How the game ended is the same for every player in it
+                draw = g.passed_draws[0] if g.passed_draws else None
                 if draw is not None:
-                    if draw.power_is_part(gp.power):
-                        row_dict['DRAW'] = draw.draw_size()
-                    else:
-                        row_dict['DRAW'] = 0
-                row_dict['NB_CENTRE'] = dots.last().count
-                elim = gp.elimination_year()
-                if elim is not None:
-                    row_dict['YEAR_ELIMINATION'] = elim % (FIRST_YEAR-1)
-                # Add in centre counts
-                for cc in dots:
-                    row_dict[_centrecount_year_to_wdd(cc.year)] = cc.count
-                # Write a row for this player in this game
-                writer.writerow(row_dict)
+                    draw_power_ids = {p.pk for p in draw.powers()}
+                    draw_size = len(draw_power_ids)
+                solo_power_id = solo_power_ids.get(g.id)
+                # TODO This is broken with replacement players
+                for gp in g.gameplayer_set.all():
+                    row = template.copy()
+                    names = gp.player.wdd_firstname_lastname()
+                    row[col['FIRST NAME']] = names[0]
+                    row[col['NAME']] = names[1]
+                    row[col['COUNTRY']] = _power_name_to_wdd(gp.power.name)
+                    row[col['SCORE']] = gp.score
+                    rank = positions[gp.power]
+                    row[col['RANK']] = rank
+                    row[col['EXAEQUO']] = rank_counts[rank]
+                    power_ccs = ccs.get((g.id, gp.power_id), [])
+                    dots = [(year, count) for year, count in power_ccs if year > 1900]
+                    # How did the game end?
+                    if solo_power_id is not None:
+                        if solo_power_id == gp.power_id:
+                            # This player won
+                            row[col['DRAW']] = 1
+                        else:
+                            # Another player won
+                            row[col['DRAW']] = 0
+                    if draw is not None:
+                        if gp.power_id in draw_power_ids:
+                            row[col['DRAW']] = draw_size
+                        else:
+                            row[col['DRAW']] = 0
+                    row[col['NB_CENTRE']] = dots[-1][1]
+                    elim = elim_years.get((g.id, gp.power_id))
+                    if elim is not None:
+                        row[col['YEAR_ELIMINATION']] = elim % (FIRST_YEAR-1)
+                    # Add in centre counts
+                    for year, count in dots:
+                        row[col[_centrecount_year_to_wdd(year)]] = count
+                    # Write a row for this player in this game
+                    yield writer.writerow(row)
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="%s%dboards.csv"' % (t.name,
+                                                                                 t.start_date.year)
 
     return response
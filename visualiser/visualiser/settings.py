@@ -30,8 +30,15 @@ TEMPLATES = [
         'DIRS': [
             os.path.join(BASE_DIR, 'templates')
         ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse each template just once.
+            # Note that this means template changes need a server restart
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 # Insert your TEMPLATE_CONTEXT_PROCESSORS here or use this
                 # list if you haven't customized them:
@@ -104,6 +111,28 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered read-only tournament pages.
+    # Changes to tournament data clear this cache, but a LocMemCache is
+    # private to each process, so only the process that made the change
+    # sees it straight away. Others may serve stale pages for up to
+    # PAGE_CACHE_SECONDS. Use a shared backend (e.g. memcached)
+    # when running multiple worker processes.
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+    },
+}
+
+# How long to cache the read-only tournament pages for
+PAGE_CACHE_SECONDS = 60
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.6/topics/i18n/
 